@@ -1,11 +1,10 @@
 import streamlit as st
-from PIL import Image
+from utils.assets import sidebar_logo
 
 st.set_page_config(
     page_title='Home'
 )
-image = Image.open('logo.jpg')
-st.sidebar.image(image, width=120)
+sidebar_logo()
 
 st.sidebar.markdown('# India Delivery')
 st.sidebar.markdown('## Best delivery in town')
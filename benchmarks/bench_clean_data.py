@@ -0,0 +1,100 @@
+# Imports
+import argparse
+import json
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_raw
+from utils.data import clean_data
+
+# =========================
+# clean_data BEFORE / AFTER
+# =========================
+# Usage: python -m benchmarks.bench_clean_data --sizes 45593 1000000 10000000
+# The legacy version is the per-page clean_data() the pages used before the
+# single pass rewrite. Both outputs are compared on every run.
+
+# DataFrame.applymap was renamed to DataFrame.map in pandas 2.1
+_applymap = getattr(pd.DataFrame, 'map', None) or pd.DataFrame.applymap
+
+
+def clean_data_legacy(df1):
+
+    # Setting columns to lower
+    df1.columns = [i.lower() for i in df1.columns ]
+
+    # Removing N/A and converting to int - delivery_person_age'
+    lines = df1['delivery_person_age'] != 'NaN '
+    df1 = df1.loc[lines, :].copy()
+    df1['delivery_person_age'] = df1['delivery_person_age'].astype('int64')
+
+    # Removing N/A - road_traffic_density
+    lines = df1['road_traffic_density'] != 'NaN '
+    df1 = df1.loc[lines, :].copy()
+
+    # Removing N/A - festival
+    lines = df1['festival'] != 'NaN '
+    df1 = df1.loc[lines, :].copy()
+
+    # Removing N/A - city
+    lines = df1['city'] != 'NaN '
+    df1 = df1.loc[lines, :].copy()
+
+    # Transforming time taken in int
+    df1['time_taken(min)'] = df1['time_taken(min)'].str[-2:].astype('int64')
+
+    # Converting to float - delivery_person_ratings
+    df1['delivery_person_ratings'] = df1['delivery_person_ratings'].astype(float)
+
+    # Converting to datetime - order_date
+    df1['order_date'] = pd.to_datetime(df1['order_date'], format='%d-%m-%Y')
+
+    # Removing N/A and converting to int - multiple_deliveries
+    lines = df1['multiple_deliveries'] != 'NaN '
+    df1 = df1.loc[lines, :].copy()
+    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype('int64')
+
+    # Removing spaces in object features
+    df1 = _applymap(df1, lambda x: x.strip() if isinstance(x, str) else x)
+
+    return df1
+
+
+def best_time(func, df_raw, repeat):
+    # Best of `repeat` runs, each on a fresh copy since clean_data renames columns
+    best = float('inf')
+    for _ in range(repeat):
+        df = df_raw.copy()
+        start = time.perf_counter()
+        out = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='clean_data before/after benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[45593, 1000000, 10000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='optional JSON file for the results')
+    args = parser.parse_args()
+
+    results = []
+    for n in args.sizes:
+        df_raw = make_raw(n)
+        repeat = args.repeat if n <= 1000000 else 1
+        legacy, expected = best_time(clean_data_legacy, df_raw, repeat)
+        vectorized, got = best_time(clean_data, df_raw, repeat)
+        pd.testing.assert_frame_equal(got, expected)
+
+        results.append({'rows': n, 'legacy_s': round(legacy, 4), 'vectorized_s': round(vectorized, 4),
+                        'speedup': round(legacy / vectorized, 1)})
+        print('{rows:>10} rows  legacy {legacy_s:8.3f}s  vectorized {vectorized_s:8.3f}s  x{speedup}'.format(**results[-1]))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
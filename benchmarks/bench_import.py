@@ -0,0 +1,57 @@
+# Imports
+import argparse
+import ast
+import glob
+import re
+import subprocess
+import sys
+
+# =========================
+# IMPORT TIME PER PAGE
+# =========================
+# Usage: python -m benchmarks.bench_import [--repeat 5] [--top 8]
+# Cold start cost of each page: its module level imports are run in a fresh
+# interpreter with python -X importtime, and the total time and the slowest
+# top level packages are printed (best of --repeat runs). Run it on two
+# checkouts to compare the import time before and after a change.
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def page_imports(path):
+    # Source of the import statements at module level of a page
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    return '\n'.join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def import_profile(source):
+    # (total ms, {top level package: cumulative ms}) of one fresh interpreter
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', source], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    total, packages = 0, {}
+    for self_us, cumulative_us, indent, name in IMPORT_LINE.findall(result.stderr):
+        total += int(self_us)
+        if len(indent) == 1:
+            package = name.split('.')[0]
+            packages[package] = packages.get(package, 0) + int(cumulative_us) / 1000
+    return total / 1000, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import time of every page of the dashboard')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8)
+    args = parser.parse_args()
+
+    for path in ['Homes.py'] + sorted(glob.glob('pages/*.py')):
+        runs = [import_profile(page_imports(path)) for _ in range(args.repeat)]
+        total, packages = min(runs, key=lambda run: run[0])
+        slowest = sorted(packages.items(), key=lambda item: -item[1])[:args.top]
+        print('{:<34} {:8.1f} ms  {}'.format(path, total, '  '.join('{} {:.0f}'.format(*p) for p in slowest)))
+
+
+if __name__ == '__main__':
+    main()
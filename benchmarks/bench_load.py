@@ -0,0 +1,219 @@
+# Imports
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+
+from benchmarks.synthetic import write_csv
+
+# =========================
+# CONCURRENT SESSIONS LOAD TEST
+# =========================
+# Usage: python -m benchmarks.bench_load [--rows 200000] [--sessions 1 2 4 8] [--reruns 20]
+# Starts the dashboard on a headless Streamlit server bound to 127.0.0.1
+# (nothing leaves the machine) and connects N sessions to it at once over
+# its websocket, the way N browsers would. Every session picks one of the
+# three pages at random and sends a rerun with a random date range and
+# random traffic / weather selections, read from the widgets the server
+# sent for that page; the latency of a rerun is the time until the server
+# reports the script finished. A fresh server is started for each N (the
+# data layer and the chart cache are per process) and warmed up by one
+# session visiting every page, so the levels are comparable. For each N it
+# reports the throughput, the p50/p95/p99 rerun latency, and the server's
+# RSS at the end and its peak.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGE_NAMES = ['business view', 'delivery person view', 'restaurant view']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, csv_path, timeout):
+    # Streamlit server running the app on port, waits until it answers
+    env = dict(os.environ, INDIA_DELIVERY_DATA=csv_path)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', 'Homes.py', '--server.headless', 'true',
+         '--server.address', '127.0.0.1', '--server.port', str(port), '--server.fileWatcherType', 'none',
+         '--browser.gatherUsageStats', 'false', '--logger.level', 'error'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            urllib.request.urlopen('http://127.0.0.1:{}/_stcore/health'.format(port), timeout=1)
+            return server
+        except OSError:
+            if server.poll() is not None:
+                break
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError('the Streamlit server did not start on port {}'.format(port))
+
+
+def memory_mb(pid):
+    # Current and peak resident set size of a process (Linux /proc)
+    values = {}
+    with open('/proc/{}/status'.format(pid)) as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('VmRSS', 'VmHWM'):
+                values[key] = int(value.split()[0]) / 2**10
+    return values.get('VmRSS', float('nan')), values.get('VmHWM', float('nan'))
+
+
+class Session:
+    """
+    One browser tab: a websocket to the server, the widgets of each page it
+    has visited and the latency of each of its reruns
+    """
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.pages = {}
+        self.widgets = {}
+        self.latencies = []
+        self.errors = []
+
+    async def rerun(self, page, widget_states=()):
+        # Sends a rerun of page and waits for the end of the script
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        msg.rerun_script.page_script_hash = self.pages.get(page, '')
+        msg.rerun_script.widget_states.widgets.extend(widget_states)
+        await self.websocket.send(msg.SerializeToString())
+
+        widgets = []
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.websocket.recv())
+            kind = forward.WhichOneof('type')
+            if kind == 'navigation' and not self.pages:
+                self.pages = {p.page_name: p.page_script_hash for p in forward.navigation.app_pages}
+            elif kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                if element.WhichOneof('type') in ('slider', 'multiselect'):
+                    widgets.append(getattr(element, element.WhichOneof('type')))
+                elif element.WhichOneof('type') == 'exception':
+                    self.errors.append('{}: {}'.format(element.exception.type, element.exception.message))
+            elif kind == 'script_finished':
+                if widgets:
+                    self.widgets[page] = widgets
+                return
+
+    def random_states(self, page, rng):
+        # A date range of at least one step and non-empty traffic / weather selections
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        states = []
+        for widget in self.widgets.get(page, []):
+            state = WidgetState(id=widget.id)
+            if hasattr(widget, 'step'):
+                steps = int((widget.max - widget.min) // widget.step)
+                lo, hi = sorted(rng.sample(range(steps + 1), 2)) if steps else (0, 0)
+                state.double_array_value.data.extend([widget.min + lo * widget.step, widget.min + hi * widget.step])
+            else:
+                options = list(widget.options)
+                state.string_array_value.data.extend(rng.sample(options, rng.randint(1, len(options))))
+            states.append(state)
+        return states
+
+
+async def run_session(port, number, reruns, timeout, seed, pages=None):
+    import websockets
+
+    rng = random.Random(seed + number)
+    url = 'ws://127.0.0.1:{}/_stcore/stream'.format(port)
+    async with websockets.connect(url, subprotocols=['streamlit'], max_size=None) as websocket:
+        session = Session(websocket)
+        # Landing page, as a browser does when it connects
+        await asyncio.wait_for(session.rerun(None), timeout)
+        for page in pages or [rng.choice(PAGE_NAMES) for _ in range(reruns)]:
+            start = time.perf_counter()
+            if page not in session.widgets:
+                # First visit of the page: default filters
+                await asyncio.wait_for(session.rerun(page), timeout)
+            else:
+                await asyncio.wait_for(session.rerun(page, session.random_states(page, rng)), timeout)
+            session.latencies.append(time.perf_counter() - start)
+    return session
+
+
+async def run_sessions(port, sessions, reruns, timeout, seed):
+    return await asyncio.gather(*[run_session(port, i, reruns, timeout, seed) for i in range(sessions)])
+
+
+def run_level(sessions, args, csv_path):
+    port = free_port()
+    server = start_server(port, csv_path, args.timeout)
+    try:
+        # Warm-up: the first rerun of the process loads and cleans the data
+        asyncio.run(run_session(port, -1, 0, args.timeout, args.seed, pages=PAGE_NAMES))
+        warm_rss, _ = memory_mb(server.pid)
+
+        start = time.perf_counter()
+        results = asyncio.run(run_sessions(port, sessions, args.reruns, args.timeout, args.seed))
+        seconds = time.perf_counter() - start
+        rss, peak = memory_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = [latency for session in results for latency in session.latencies]
+    errors = [error for session in results for error in session.errors]
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {'sessions': sessions, 'reruns': len(latencies), 'seconds': round(seconds, 3),
+            'reruns_per_second': round(len(latencies) / seconds, 2),
+            'p50_ms': round(p50, 1), 'p95_ms': round(p95, 1), 'p99_ms': round(p99, 1),
+            'warm_rss_mb': round(warm_rss, 1), 'rss_mb': round(rss, 1), 'peak_rss_mb': round(peak, 1),
+            'errors': errors[:5]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent sessions load test of the dashboard pages')
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--csv', help='dataset to serve (default: a synthetic one of --rows rows)')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--reruns', type=int, default=20, help='reruns per session')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds allowed per rerun')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.abspath(args.csv) if args.csv else write_csv(args.rows, os.path.join(tmp, 'train.csv'))
+        print('{}\n'.format(csv_path if args.csv else '{} synthetic rows'.format(args.rows)))
+
+        print('{:>8} {:>7} {:>9} {:>9} {:>9} {:>9} {:>9} {:>9} {:>9}'.format(
+            'sessions', 'reruns', 'reruns/s', 'p50_ms', 'p95_ms', 'p99_ms', 'warm_mb', 'rss_mb', 'peak_mb'))
+        results = []
+        for sessions in args.sessions:
+            result = run_level(sessions, args, csv_path)
+            results.append(result)
+            print('{sessions:>8} {reruns:>7} {reruns_per_second:>9} {p50_ms:>9} {p95_ms:>9} {p99_ms:>9} '
+                  '{warm_rss_mb:>9} {rss_mb:>9} {peak_rss_mb:>9}'.format(**result))
+            for error in result['errors']:
+                print('    error: {}'.format(error))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'rows': args.rows, 'csv': args.csv, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
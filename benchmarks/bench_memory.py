@@ -0,0 +1,63 @@
+# Imports
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_raw
+from utils.data import add_derived_columns, clean_data
+from utils.schema import compact, memory_report
+
+# =========================
+# MEMORY REPORT BEFORE / AFTER
+# =========================
+# Usage: python -m benchmarks.bench_memory [--rows 1000000] [--csv train.csv]
+# Compares the cleaned dataset as clean_data() returns it (object strings,
+# int64, float64, every column) with the compact schema of utils/schema.py:
+# deep memory per column, then the time of the pages' groupbys on both.
+
+
+def groupbys(df1):
+    # The row level groupbys of the pages and the cube build
+    return {
+        'rating_per_person': lambda: df1.groupby('delivery_person_id', observed=True)['delivery_person_ratings'].mean(),
+        'time_per_city_person': lambda: df1.groupby(['city', 'delivery_person_id'], observed=True)['time_taken(min)'].mean(),
+        'map_city_traffic_median': lambda: df1.groupby(['city', 'road_traffic_density'], observed=True)[
+            ['delivery_location_latitude', 'delivery_location_longitude']].median(),
+        'orders_per_cell': lambda: df1.groupby(['order_date', 'city', 'road_traffic_density', 'weatherconditions',
+                                                'festival', 'type_of_order'], observed=True).size(),
+    }
+
+
+def best_time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory of the cleaned dataset before/after the compact schema')
+    parser.add_argument('--rows', type=int, default=1000000, help='synthetic rows (ignored with --csv)')
+    parser.add_argument('--csv', help='report on this CSV instead of synthetic data')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df_raw = pd.read_csv(args.csv) if args.csv else make_raw(args.rows)
+    before = add_derived_columns(clean_data(df_raw))
+    after = compact(before)
+
+    print('{} rows\n'.format(len(before)))
+    print(memory_report(before, after).to_string(index=False))
+
+    print('\n{:<26} {:>10} {:>10} {:>8}'.format('groupby', 'before_s', 'after_s', 'speedup'))
+    slow, fast = groupbys(before), groupbys(after)
+    for name in slow:
+        before_s, after_s = best_time(slow[name], args.repeat), best_time(fast[name], args.repeat)
+        print('{:<26} {:10.4f} {:10.4f} {:>7.1f}x'.format(name, before_s, after_s, before_s / after_s))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Imports
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_raw
+from utils import parallel
+from utils.data import add_derived_columns, clean_data
+from utils.delivery_person import rating_per_person, top_deliverers
+from utils.schema import compact
+
+# =========================
+# SERIAL / PROCESS POOL
+# =========================
+# Usage: python -m benchmarks.bench_parallel --rows 1000000 5000000 --workers 4
+# Times the row level groupbys of the delivery person page with pandas and in
+# the worker pool of utils/parallel.py, and checks both give the same frames.
+
+
+def best_time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = func()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serial vs process pool aggregation benchmark')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    stages = {'top_deliverers': lambda df1: top_deliverers(df1),
+              'rating_per_person': lambda df1: rating_per_person(df1)}
+
+    for n in args.rows:
+        df1 = compact(add_derived_columns(clean_data(make_raw(n)))).sort_values('order_date', kind='stable')
+        for name, func in stages.items():
+            parallel.WORKERS = 1
+            serial, expected = best_time(lambda: func(df1), args.repeat)
+
+            parallel.WORKERS, parallel.MIN_ROWS = args.workers, 0
+            func(df1)  # starts the pool
+            pool, got = best_time(lambda: func(df1), args.repeat)
+
+            for x, y in zip(expected if isinstance(expected, tuple) else (expected,),
+                            got if isinstance(got, tuple) else (got,)):
+                pd.testing.assert_frame_equal(x, y, rtol=1e-12)
+            print('{:>10} rows  {:<18} serial {:8.3f}s  {} workers {:8.3f}s  x{:.1f}'.format(
+                len(df1), name, serial, args.workers, pool, serial / pool))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# Imports
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.suite import DATE_RANGE, TRAFFIC_CONDITION, WEATHER_CONDITION
+from benchmarks.synthetic import write_csv
+from utils.business import (country_map, delivery_person_by_week, order_by_week, order_distribution_traffic,
+                            order_metric, traffic_order_city)
+from utils.cube import rollup
+from utils.data import load_cube, load_data, load_distinct
+from utils.delivery_person import top_deliverers
+from utils.distinct import count_distinct, select_sketch
+from utils.filters import apply_filters
+from utils.restaurant import (avg_delivery_by_city, avg_delivery_city, avg_delivery_order_type, avg_deviation_by_city,
+                              delivery_time_festival, distance)
+
+# =========================
+# PEAK MEMORY PER SESSION RERUN
+# =========================
+# Usage: python -m benchmarks.bench_session_memory [--rows 1000000]
+# Loads a synthetic train.csv through the data layer (the process-wide cache
+# every session shares, not counted), then traces the allocations of one
+# rerun of each page for a few sidebar states. The peak is printed next to
+# the size of the cached cleaned frame, in copies of it; the README lists the
+# pages that still go above one copy.
+
+# Columns of pages/1_business_view.py and pages/2_delivery_person_view.py
+BUSINESS_COLUMNS = ['order_date', 'city', 'road_traffic_density', 'weatherconditions', 'time_taken(min)',
+                    'restaurant_latitude', 'restaurant_longitude', 'delivery_location_latitude',
+                    'delivery_location_longitude']
+DELIVERY_COLUMNS = ['order_date', 'city', 'road_traffic_density', 'weatherconditions', 'delivery_person_id',
+                    'delivery_person_ratings', 'time_taken(min)']
+
+SIDEBAR_STATES = {
+    'defaults': (DATE_RANGE, TRAFFIC_CONDITION, WEATHER_CONDITION),
+    'one_week': ((DATE_RANGE[0], DATE_RANGE[0] + pd.Timedelta(days=6)), TRAFFIC_CONDITION, WEATHER_CONDITION),
+    'jam_sunny': (DATE_RANGE, ['Jam'], ['conditions Sunny']),
+}
+
+
+def business_view(path, filters):
+    df2 = apply_filters(load_data(path, BUSINESS_COLUMNS), *filters)
+    cube, persons = load_cube(path)
+    cube2, distinct2 = apply_filters(cube, *filters), select_sketch(load_distinct(path), persons, *filters)
+    return [order_metric(cube2), order_distribution_traffic(cube2), traffic_order_city(cube2),
+            order_by_week(cube2), delivery_person_by_week(cube2, distinct2), country_map(df2)]
+
+
+def delivery_person_view(path, filters):
+    df2 = apply_filters(load_data(path, DELIVERY_COLUMNS), *filters)
+    cube2 = apply_filters(load_cube(path)[0], *filters)
+    rating = df2[['delivery_person_ratings', 'delivery_person_id']].groupby('delivery_person_id', observed=True).mean()
+    return [rating, rollup(cube2, 'road_traffic_density', 'rating'), rollup(cube2, 'weatherconditions', 'rating'),
+            top_deliverers(df2)]
+
+
+def restaurant_view(path, filters):
+    cube, persons = load_cube(path)
+    cube2, distinct2 = apply_filters(cube, *filters), select_sketch(load_distinct(path), persons, *filters)
+    return [count_distinct(distinct2), distance(cube2), delivery_time_festival(cube2, 'Yes'),
+            avg_delivery_city(cube2), avg_delivery_order_type(cube2), avg_delivery_by_city(cube2),
+            avg_deviation_by_city(cube2)]
+
+
+def peak_mb(func, *args):
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak traced memory of one rerun of each page')
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_csv(args.rows, os.path.join(tmp, 'train.csv'))
+        base_mb = load_data(path).memory_usage(index=True, deep=True).sum() / 2**20
+        print('cached cleaned frame: {:.1f} MB\n'.format(base_mb))
+        print('{:<22} {:<10} {:>10} {:>9}'.format('page', 'sidebar', 'peak_mb', 'copies'))
+
+        for page in (business_view, delivery_person_view, restaurant_view):
+            # First run warms the shared caches (frames, cube, filter indexes)
+            page(path, SIDEBAR_STATES['defaults'])
+            for state, filters in SIDEBAR_STATES.items():
+                peak = peak_mb(page, path, filters)
+                print('{:<22} {:<10} {:10.1f} {:9.2f}'.format(page.__name__, state, peak, peak / base_mb))
+
+
+if __name__ == '__main__':
+    main()
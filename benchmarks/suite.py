@@ -0,0 +1,158 @@
+# Imports
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import DAYS, FIRST_DATE, TRAFFIC, WEATHER, make_raw
+from utils.business import delivery_person_by_week, order_by_week, order_metric
+from utils.cube import build_cube
+from utils.data import add_derived_columns, clean_data
+from utils.distinct import build_sketch, select_sketch
+from utils.delivery_person import top_deliverers
+from utils.filters import apply_filters, build_index
+from utils.restaurant import avg_delivery_order_type, avg_deviation_by_city, distance
+from utils.schema import compact
+
+# =========================
+# BENCHMARK SUITE
+# =========================
+# Times every stage of the dashboard on synthetic data and records its peak
+# traced memory (tracemalloc, in a separate run so tracing does not skew the
+# timings). Results are saved as JSON and two result files can be compared
+# to catch regressions between versions.
+#
+# Usage:
+#   python -m benchmarks.suite --sizes 45593 1000000 --output results.json
+#   python -m benchmarks.suite --compare before.json after.json [--threshold 1.2]
+
+DEFAULT_SIZES = [45593, 1000000, 10000000]
+
+# Sidebar defaults of the pages: whole date range, every traffic and weather
+DATE_RANGE = (pd.Timestamp(FIRST_DATE), pd.Timestamp(FIRST_DATE) + pd.Timedelta(days=DAYS - 1))
+TRAFFIC_CONDITION = [value.strip() for value in TRAFFIC]
+WEATHER_CONDITION = list(WEATHER)
+
+
+def measure(func, repeat):
+    """
+    Best wall time of `repeat` calls and the peak traced memory of one more call
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def stages(df_raw):
+    """
+    (name, callable) of every measured stage, in pipeline order. Later stages
+    use the outputs of the earlier ones, like the pages do.
+    """
+    df_wide = add_derived_columns(clean_data(df_raw.copy()))
+    df1 = compact(df_wide).sort_values('order_date', kind='stable')
+    cube, persons = build_cube(df1)
+    df2 = apply_filters(df1, DATE_RANGE, TRAFFIC_CONDITION, WEATHER_CONDITION)
+    cube2 = apply_filters(cube, DATE_RANGE, TRAFFIC_CONDITION, WEATHER_CONDITION)
+    distinct = build_sketch(persons)
+    distinct2 = select_sketch(distinct, persons, DATE_RANGE, TRAFFIC_CONDITION, WEATHER_CONDITION)
+
+    return [
+        ('clean_data', lambda: clean_data(df_raw.copy())),
+        ('compact', lambda: compact(df_wide)),
+        ('build_cube', lambda: build_cube(df1)),
+        ('build_filter_index', lambda: build_index(df1)),
+        ('apply_filters', lambda: apply_filters(df1, DATE_RANGE, TRAFFIC_CONDITION, WEATHER_CONDITION)),
+        ('order_metric', lambda: order_metric(cube2)),
+        ('order_by_week', lambda: order_by_week(cube2)),
+        ('build_distinct', lambda: build_sketch(persons)),
+        ('delivery_person_by_week', lambda: delivery_person_by_week(cube2, distinct2)),
+        ('top_deliverers', lambda: top_deliverers(df2)),
+        ('distance', lambda: distance(cube2)),
+        ('avg_delivery_order_type', lambda: avg_delivery_order_type(cube2)),
+        ('avg_deviation_by_city', lambda: avg_deviation_by_city(cube2)),
+    ]
+
+
+def git_version():
+    try:
+        out = subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, repeat):
+    results = []
+    for n in sizes:
+        df_raw = make_raw(n)
+        for name, func in stages(df_raw):
+            seconds, peak = measure(func, repeat if n <= 1000000 else 1)
+            results.append({'rows': n, 'stage': name, 'seconds': round(seconds, 6), 'peak_mb': round(peak / 2**20, 2)})
+            print('{:>10} {:<26} {:10.4f}s {:10.1f} MB'.format(n, name, seconds, peak / 2**20))
+
+    meta = {'version': git_version(), 'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+            'machine': platform.machine()}
+    return {'meta': meta, 'results': results}
+
+
+def compare(before, after, threshold, min_seconds=0.005):
+    """
+    Prints the time ratio of every (rows, stage) in both files and returns the
+    regressions: ratios above threshold on stages slower than min_seconds
+    """
+    old = {(r['rows'], r['stage']): r for r in before['results']}
+    regressions = []
+    for r in after['results']:
+        base = old.get((r['rows'], r['stage']))
+        if base is None:
+            continue
+        ratio = r['seconds'] / base['seconds'] if base['seconds'] else float('inf')
+        flag = ratio > threshold and max(r['seconds'], base['seconds']) >= min_seconds
+        if flag:
+            regressions.append(r)
+        print('{:>10} {:<26} {:10.4f}s -> {:10.4f}s  x{:<6.2f} {:8.1f} -> {:8.1f} MB {}'.format(
+            r['rows'], r['stage'], base['seconds'], r['seconds'], ratio, base['peak_mb'], r['peak_mb'],
+            'REGRESSION' if flag else ''))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dashboard benchmark suite')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='JSON file for the results')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two result files')
+    parser.add_argument('--threshold', type=float, default=1.2, help='slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            before = json.load(f)
+        with open(args.compare[1]) as f:
+            after = json.load(f)
+        sys.exit(1 if compare(before, after, args.threshold) else 0)
+
+    results = run(args.sizes, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
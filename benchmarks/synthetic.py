@@ -0,0 +1,107 @@
+# Imports
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# =========================
+# SYNTHETIC DATA
+# =========================
+# Raw frames shaped like train.csv (same columns, same spacing quirks and
+# 'NaN ' sentinels) so the pipeline can be measured at any size. Cardinalities
+# follow the original file: 22 city codes x 20 restaurants x 3 deliverers,
+# 3 city types, 4 traffic levels, 6 weathers and 55 days of orders.
+#
+# Usage: python -m benchmarks.synthetic 1000000 --output train.csv
+
+CITY_CODES = ['INDO', 'BANG', 'COIMB', 'CHEN', 'HYD', 'RANCHI', 'MYS', 'DEH', 'KOC', 'PUNE', 'LUDH',
+              'KNP', 'MUM', 'KOL', 'JAP', 'SUR', 'GOA', 'AURG', 'AGR', 'VAD', 'ALH', 'BHP']
+
+# Approximate (latitude, longitude) of each city code
+CITY_CENTERS = [(22.72, 75.86), (12.97, 77.59), (11.02, 76.96), (13.08, 80.27), (17.39, 78.49),
+                (23.34, 85.31), (12.30, 76.64), (30.32, 78.03), (9.93, 76.26), (18.52, 73.86),
+                (30.90, 75.86), (26.45, 80.33), (19.08, 72.88), (22.57, 88.36), (26.91, 75.79),
+                (21.17, 72.83), (15.30, 74.12), (19.88, 75.34), (27.18, 78.01), (22.31, 73.18),
+                (25.44, 81.85), (23.26, 77.41)]
+
+CITIES = ['Metropolitian ', 'Urban ', 'Semi-Urban ']
+TRAFFIC = ['Low ', 'Medium ', 'High ', 'Jam ']
+WEATHER = ['conditions Sunny', 'conditions Stormy', 'conditions Sandstorms',
+           'conditions Cloudy', 'conditions Fog', 'conditions Windy']
+ORDER_TYPES = ['Snack ', 'Meal ', 'Drinks ', 'Buffet ']
+VEHICLES = ['motorcycle ', 'scooter ', 'electric_scooter ', 'bicycle ']
+
+FIRST_DATE = '2022-02-11'
+DAYS = 55
+
+
+def _with_nan(r, values, rate):
+    # Replaces a fraction of the values with the 'NaN ' sentinel used by the dataset
+    values = values.astype(object)
+    values[r.random(len(values)) < rate] = 'NaN '
+    return values
+
+
+def make_raw(n, seed=0):
+    """
+    Returns a raw (uncleaned) frame with n rows and the columns of train.csv
+    """
+    r = np.random.default_rng(seed)
+
+    # Delivery people: 22 cities x 20 restaurants x 3 deliverers
+    persons = np.array(['%sRES%02dDEL%02d ' % (c, i, j) for c in CITY_CODES for i in range(1, 21) for j in range(1, 4)])
+    person = r.integers(0, len(persons), n)
+    center = np.array(CITY_CENTERS)[person // 60]
+
+    restaurant = center + r.normal(0, 0.05, (n, 2))
+    delivery = restaurant + r.uniform(-0.15, 0.15, (n, 2))
+
+    dates = pd.Timestamp(FIRST_DATE) + pd.to_timedelta(r.integers(0, DAYS, n), unit='D')
+    minutes = r.integers(8 * 60, 23 * 60, n)
+    ordered = pd.to_timedelta(minutes, unit='min')
+    picked = pd.to_timedelta(minutes + r.choice([5, 10, 15], n), unit='min')
+
+    df = pd.DataFrame({
+        'ID': pd.Series(np.arange(n)).map('0x{:04x} '.format),
+        'Delivery_person_ID': persons[person],
+        'Delivery_person_Age': _with_nan(r, r.integers(20, 40, n).astype(str), 0.04),
+        'Delivery_person_Ratings': np.round(r.uniform(2.5, 5.0, n), 1).astype(str),
+        'Restaurant_latitude': restaurant[:, 0],
+        'Restaurant_longitude': restaurant[:, 1],
+        'Delivery_location_latitude': delivery[:, 0],
+        'Delivery_location_longitude': delivery[:, 1],
+        'Order_Date': dates.strftime('%d-%m-%Y'),
+        'Time_Orderd': _with_nan(r, (pd.Timestamp(0) + ordered).strftime('%H:%M:%S').to_numpy(), 0.04),
+        'Time_Order_picked': (pd.Timestamp(0) + picked).strftime('%H:%M:%S'),
+        'Weatherconditions': _with_nan(r, np.array(WEATHER)[r.integers(0, len(WEATHER), n)], 0.01),
+        'Road_traffic_density': _with_nan(r, np.array(TRAFFIC)[r.choice(4, n, p=[0.34, 0.24, 0.22, 0.20])], 0.01),
+        'Vehicle_condition': r.integers(0, 4, n),
+        'Type_of_order': np.array(ORDER_TYPES)[r.integers(0, len(ORDER_TYPES), n)],
+        'Type_of_vehicle': np.array(VEHICLES)[r.choice(4, n, p=[0.58, 0.33, 0.08, 0.01])],
+        'multiple_deliveries': _with_nan(r, r.choice(4, n, p=[0.31, 0.62, 0.05, 0.02]).astype(str), 0.02),
+        'Festival': _with_nan(r, np.where(r.random(n) < 0.02, 'Yes ', 'No '), 0.005),
+        'City': _with_nan(r, np.array(CITIES)[r.choice(3, n, p=[0.75, 0.22, 0.03])], 0.026),
+        'Time_taken(min)': pd.Series(r.integers(10, 55, n)).map('(min) {}'.format),
+    })
+
+    # Ratings are missing on the same rows as ages, like in the original file
+    df.loc[df['Delivery_person_Age'] == 'NaN ', 'Delivery_person_Ratings'] = 'NaN '
+    return df
+
+
+def write_csv(n, path='train.csv', seed=0):
+    make_raw(n, seed).to_csv(path, index=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a synthetic train.csv-shaped file')
+    parser.add_argument('rows', type=int)
+    parser.add_argument('--output', default='train.csv')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(write_csv(args.rows, args.output, args.seed))
+
+
+if __name__ == '__main__':
+    main()
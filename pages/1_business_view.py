@@ -1,142 +1,51 @@
 # Imports
-import pandas as pd
-import numpy as np
-import seaborn as sns
-from PIL import Image
-import plotly.express as px
-from datetime import datetime
 import streamlit as st
-import folium
-from streamlit_folium import folium_static
+from utils.assets import sidebar_logo
+from utils.business import (country_map_html, delivery_person_by_week, delivery_person_rolling, order_by_week,
+                            order_distribution_traffic, order_metric, traffic_order_city)
+from utils.data import dataset_label, dataset_version, load_cube, load_data, load_distinct
+from utils.distinct import select_sketch
+from utils.filters import apply_filters, date_limits
+from utils.memo import cached, filter_state, lazy
+from utils.metrics import debug_panel, finish_run, stage, start_run
 import warnings
 warnings.filterwarnings('ignore')
 
 st.set_page_config(page_title='Business View', layout='wide')
 
-# =========================
-# FUNCTIONS
-# =========================
-
-def clean_data(df1):
-
-    # Setting columns to lower
-    df1.columns = [i.lower() for i in df1.columns ]
-
-    # Removing N/A and converting to int - delivery_person_age'
-    lines = df1['delivery_person_age'] != 'NaN '
-    df1 = df1.loc[lines, :].copy()
-    df1['delivery_person_age'] = df1['delivery_person_age'].astype('int64')
-
-    # Removing N/A - road_traffic_density
-    lines = df1['road_traffic_density'] != 'NaN '
-    df1 = df1.loc[lines, :].copy()
-
-    # Removing N/A - festival
-    lines = df1['festival'] != 'NaN '
-    df1 = df1.loc[lines, :].copy()
-
-    # Removing N/A - city
-    lines = df1['city'] != 'NaN '
-    df1 = df1.loc[lines, :].copy()
-
-    # Transforming time taken in int
-    df1['time_taken(min)'] = df1['time_taken(min)'].str[-2:].astype('int64')
-
-    # Converting to float and replacing N/A with "" - delivery_person_ratings
-    df1['delivery_person_ratings'].fillna("", inplace=True)
-    df1['delivery_person_ratings'] = df1['delivery_person_ratings'].astype(float)
-
-    # Converting to datetime - order_date
-    df1['order_date'] = pd.to_datetime(df1['order_date'], format='%d-%m-%Y')
-
-    # Removing N/A and converting to int - multiple_deliveries
-    lines = df1['multiple_deliveries'] != 'NaN '
-    df1 = df1.loc[lines, :].copy()
-    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype('int64')
-
-    # Removing spaces in object features
-    df1 = df1.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-
-    return df1
-
-
-def order_metric(df2):
-    # 2.1.1 Quantity orders per day
-    df_aux = df2.groupby('order_date')['id'].count().reset_index(name='count')
-    fig = px.bar(df_aux, x='order_date', y='count')
+# Hot path timings of this rerun (utils/metrics.py)
+start_run('business_view')
 
-    return fig 
-
-def order_distribution_traffic(df2):
-    # 2.1.3 Orders distribution per traffic
-    df_aux = df2.groupby('road_traffic_density')['id'].count().reset_index()
-    df_aux['percentage'] = df_aux['id'] / df_aux['id'].sum() * 100
-    fig = px.pie(df_aux, names= 'road_traffic_density',values='percentage')
-    return fig
-
-def traffic_order_city(df2):
-    # 2.1.4 Comparison of order volume by city and traffic
-    df_aux = df2.groupby(['city', 'road_traffic_density'])['id'].count().reset_index()
-    fig = px.scatter(df_aux, x='city', y='road_traffic_density', size='id', color='city')
-    return fig
-
-def order_by_week(df2):
-    # 2.1.2 Quantity orders per week
-    df2['week_of_year'] = df2['order_date'].dt.strftime('%U')
-    df_aux = df2.groupby('week_of_year')['id'].count().reset_index()
-    fig = px.line(df_aux, 'week_of_year', 'id')
-    return fig
-
-def delivery_person_by_week(df2):
-    # 2.1.5 Deliveries quantity by deliverer person per week
-    df2['week_of_year'] = df2['order_date'].dt.strftime('%U')
-    df_aux01 = df2[['id', 'week_of_year']].groupby('week_of_year').count().reset_index()
-    df_aux02 = df2[['week_of_year', 'delivery_person_id']].groupby('week_of_year').nunique().reset_index()
-    df_aux = pd.merge(df_aux01, df_aux02, how='inner')
-    df_aux['deliveries_per_person'] = df_aux['id'] / df_aux['delivery_person_id']
-    fig = px.line(df_aux, x='week_of_year', y='deliveries_per_person')
-    return fig
-
-def country_map(df2):
-    # 2.1.6 Central localization of each city by traffic 
-    df_aux = df2[['city', 'road_traffic_density', 'delivery_location_latitude', 'delivery_location_longitude']].groupby(['city', 'road_traffic_density']).median().reset_index()
-    df_aux = df_aux.head()
-
-    map = folium.Map()
-
-    for index, i in df_aux.iterrows():
-        folium.Marker([i['delivery_location_latitude'], i['delivery_location_longitude']], popup= i[['city', 'road_traffic_density']]).add_to(map)
-
-    folium_static(map, width=1024, height=600)
+# Columns used by this page (the charts are answered by the cube)
+COLUMNS = ['order_date', 'city', 'road_traffic_density', 'weatherconditions', 'time_taken(min)',
+           'restaurant_latitude', 'restaurant_longitude', 'delivery_location_latitude', 'delivery_location_longitude']
 
 # ------------------------------- Logical Structure ------------------------------
 
-# Import Dataset
-df_raw = pd.read_csv('train.csv')
-df1 = df_raw.copy()
-
-# Cleaning Dataset
-df1 = clean_data(df1)
-
-
-df2 = df1.copy()
+# Import and Clean Dataset (cached per process). The version is read first so a
+# background swap during this rerun cannot cache newer charts under an older key
+version = dataset_version()
+df1 = load_data(columns=COLUMNS)
+cube, persons = load_cube()
+distinct = load_distinct()
 
 # =========================
 # Sidebar Layoyt
 # =========================
 
-img = Image.open('logo.jpg')
-st.sidebar.image(img, width=120)
+sidebar_logo()
 
 st.sidebar.markdown('# India Delivery')
 st.sidebar.markdown('## Best delivery in town')
+st.sidebar.caption('Data: {}'.format(dataset_label()))
 st.sidebar.markdown("""___""")
 
-# Date Input
-date_slider = st.sidebar.slider('Select a date', 
-                    value= datetime(2022, 4, 13),
-                    min_value= datetime(2022, 2, 11), 
-                    max_value= datetime(2022, 4, 6), 
+# Date Input (start and end days included), over the days of the loaded data
+first_day, last_day = date_limits(cube)
+date_range = st.sidebar.slider('Select a date range', 
+                    value= (first_day, last_day),
+                    min_value= first_day, 
+                    max_value= last_day, 
                     format=('DD-MM-YYYY'))
 
 st.sidebar.markdown("""___""")
@@ -154,17 +63,15 @@ weather_condition = st.sidebar.multiselect('Weather Condition', ['conditions Sun
 # Linking Filter
 # =========================
 
-# Date Filter
-selected_lines= df2['order_date'] < date_slider
-df2 = df2.loc[selected_lines, :]
-
-# Traffic Filter
-selected_lines = df2['road_traffic_density'].isin(traffic_condition)
-df2 = df2.loc[selected_lines, :]
+# Chart cache key of this rerun: dataset version and normalized filters (utils/memo.py)
+state = (version, filter_state(date_range, traffic_condition, weather_condition))
 
-# Weather Filter
-selected_lines = df2['weatherconditions'].isin(weather_condition)
-df2 = df2.loc[selected_lines, :]
+# Date range, Traffic and Weather Filters in a single selection (utils/filters.py),
+# applied only when a chart is not cached yet
+df2 = lazy(apply_filters, df1, date_range, traffic_condition, weather_condition)
+cube2 = lazy(apply_filters, cube, date_range, traffic_condition, weather_condition)
+persons2 = lazy(apply_filters, persons, date_range, traffic_condition, weather_condition)
+distinct2 = lazy(select_sketch, distinct, persons, date_range, traffic_condition, weather_condition)
 
 
 # =========================
@@ -173,44 +80,58 @@ df2 = df2.loc[selected_lines, :]
 
 st.header('Company View')
 
-tab1, tab2, tab3 = st.tabs(['Management View', 'Tactical View', 'Geographic View'])
+# Only the open tab is computed: switching tabs reruns the page, and what the
+# other tabs computed before stays in the chart cache
+tab1, tab2, tab3 = st.tabs(['Management View', 'Tactical View', 'Geographic View'], key='business_tab', on_change='rerun')
 
 with tab1:
-    with st.container():
-        fig = order_metric(df2)
-        st.header('Orders by Day')
-        st.plotly_chart(fig, use_container_width=True)
-   
-        
-    with st.container():
+    if tab1.open:
+        with st.container():
+            fig = cached(state + ('order_metric',), lambda: order_metric(cube2()))
+            st.header('Orders by Day')
+            st.plotly_chart(fig, use_container_width=True)
+
+        with st.container():
             col1, col2 = st.columns(2)
 
             with col1:
-                fig = order_distribution_traffic(df2)
+                fig = cached(state + ('order_distribution_traffic',), lambda: order_distribution_traffic(cube2()))
                 st.header('Orders Distribution per Traffic')
                 st.plotly_chart(fig, use_container_width=True)
-                
 
             with col2:
-                fig = traffic_order_city(df2)
+                fig = cached(state + ('traffic_order_city',), lambda: traffic_order_city(cube2()))
                 st.header('Order Volume by City and Traffic')
                 st.plotly_chart(fig, use_container_width=True)
-                
+
 
 with tab2:
-    with st.container():
-        fig = order_by_week(df2)
-        st.header('Orders by Week')
-        st.plotly_chart(fig, use_container_width=True)
+    if tab2.open:
+        with st.container():
+            fig = cached(state + ('order_by_week',), lambda: order_by_week(cube2()))
+            st.header('Orders by Week')
+            st.plotly_chart(fig, use_container_width=True)
 
-    with st.container():
-        fig = delivery_person_by_week(df2)
-        st.header('Deliveries by Person per Week')
-        st.plotly_chart(fig, use_container_width=True)
+        with st.container():
+            fig = cached(state + ('delivery_person_by_week',), lambda: delivery_person_by_week(cube2(), distinct2()))
+            st.header('Deliveries by Person per Week')
+            st.plotly_chart(fig, use_container_width=True)
+
+        with st.container():
+            fig = cached(state + ('delivery_person_rolling',), lambda: delivery_person_rolling(cube2(), persons2()))
+            st.header('Deliveries by Person, Last 7 and 28 Days')
+            st.plotly_chart(fig, use_container_width=True)
 
 
 with tab3:
-    st.header('Country Map')
-    country_map(df2)
+    if tab3.open:
+        # The map is built and rendered to HTML only here, then cached
+        st.header('Country Map')
+        html, cell_deg = cached(state + ('country_map',), lambda: country_map_html(df2(), height=600))
+        if cell_deg is not None:
+            st.caption('Grid cells of {:.2f} degrees'.format(cell_deg))
+        with stage('map_iframe'):
+            st.iframe(html, width=1024, height=610)
+
 
-    
\ No newline at end of file
+debug_panel(finish_run())
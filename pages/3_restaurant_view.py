@@ -1,146 +1,57 @@
 # Imports
-import pandas as pd
-import numpy as np
-import seaborn as sns
-from PIL import Image
-import plotly.express as px
-from datetime import datetime
 import streamlit as st
-import folium
-from haversine import haversine
-from streamlit_folium import folium_static
-import plotly.graph_objects as go
+from utils.assets import sidebar_logo
+from utils.data import dataset_label, dataset_version, load_cube, load_data, load_distinct, load_sketch, load_spatial
+from utils.distinct import count_distinct, select_sketch
+from utils.filters import apply_filters, date_limits, select
+from utils.memo import cached, filter_state, lazy
+from utils.metrics import debug_panel, finish_run, start_run
+from utils.restaurant import (avg_delivery_by_city, avg_delivery_city, avg_delivery_order_type, avg_deviation_by_city,
+                              delivery_time_by_distance, delivery_time_festival, delivery_time_percentiles, distance,
+                              distance_band_chart, nearest_restaurants, percentiles_by_city_traffic,
+                              percentiles_by_festival_order_type)
 import warnings
 warnings.filterwarnings('ignore')
 
 st.set_page_config(page_title='Restaurant View', layout='wide')
 
-# =========================
-# FUNCTIONS
-# =========================
+# Row level columns of the distance and location sections
+COLUMNS = ['order_date', 'road_traffic_density', 'weatherconditions', 'time_taken(min)', 'distance_km',
+           'delivery_location_latitude', 'delivery_location_longitude']
 
-def clean_data(df1):
-
-    # Setting columns to lower
-    df1.columns = [i.lower() for i in df1.columns ]
-
-    # Removing N/A and converting to int - delivery_person_age'
-    lines = df1['delivery_person_age'] != 'NaN '
-    df1 = df1.loc[lines, :].copy()
-    df1['delivery_person_age'] = df1['delivery_person_age'].astype('int64')
-
-    # Removing N/A - road_traffic_density
-    lines = df1['road_traffic_density'] != 'NaN '
-    df1 = df1.loc[lines, :].copy()
-
-    # Removing N/A - festival
-    lines = df1['festival'] != 'NaN '
-    df1 = df1.loc[lines, :].copy()
-
-    # Removing N/A - city
-    lines = df1['city'] != 'NaN '
-    df1 = df1.loc[lines, :].copy()
-
-    # Transforming time taken in int
-    df1['time_taken(min)'] = df1['time_taken(min)'].str[-2:].astype('int64')
-
-    # Converting to float and replacing N/A with "" - delivery_person_ratings
-    df1['delivery_person_ratings'].fillna("", inplace=True)
-    df1['delivery_person_ratings'] = df1['delivery_person_ratings'].astype(float)
-
-    # Converting to datetime - order_date
-    df1['order_date'] = pd.to_datetime(df1['order_date'], format='%d-%m-%Y')
-
-    # Removing N/A and converting to int - multiple_deliveries
-    lines = df1['multiple_deliveries'] != 'NaN '
-    df1 = df1.loc[lines, :].copy()
-    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype('int64')
-
-    # Removing spaces in object features
-    df1 = df1.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-
-    return df1
-
-def distance(df2):
-    df2['distance']= df2.apply(lambda x: haversine((x['restaurant_latitude'], x['restaurant_longitude'] ), 
-                                    (x['delivery_location_latitude'], x['delivery_location_longitude'])), axis=1)
-    distance_mean = df2['distance'].mean().round(2)
-    return distance_mean
-
-def delivery_time_festival(df2, festival):
-    """
-    For festival, input Yes or No
-    """
-    df_aux = df2[['festival', 'time_taken(min)']].groupby('festival').mean().reset_index()
-    df_aux = df_aux.rename(columns={'time_taken(min)': 'time_mean'})
-    df_aux = np.round(df_aux.loc[df_aux['festival'] == festival, 'time_mean'], 2)
-    return df_aux
-
-def avg_delivery_city(df2):
-    df_aux = df2[['time_taken(min)', 'city']].groupby('city').agg({'time_taken(min)': ['mean', 'std']})
-    df_aux.columns = ['time_mean', 'time_std']
-    df_aux = df_aux.reset_index()
-
-    fig = go.Figure()
-    fig.add_trace(go.Bar(name='Control', x= df_aux['city'], y= df_aux['time_mean'], error_y= dict(type='data', array= df_aux['time_std'])))
-    fig.update_layout(barmode='group')
-    return fig 
-
-
-def avg_delivery_order_type(df2):
-    df_aux = df2[['time_taken(min)', 'city', 'type_of_order']].groupby(['city', 'type_of_order']).agg({'time_taken(min)': ['mean', 'std']})
-    df_aux.columns = ['time_mean', 'time_std']
-    df_aux = df_aux.reset_index()
-    df_aux = df_aux.groupby('city').apply(lambda x: x.sort_values('time_mean', ascending= False)).reset_index(drop=True)
-    return df_aux
-
-def avg_delivery_by_city(df2):
-    df2['distance']= df2.apply(lambda x: haversine((x['restaurant_latitude'], x['restaurant_longitude'] ), 
-                                        (x['delivery_location_latitude'], x['delivery_location_longitude'])), axis=1)
-    
-    df_aux = df2[['distance', 'city']].groupby('city').mean().reset_index()
-    fig = px.pie(df_aux, names='city', values= 'distance')
-    return fig
-
-def avg_deviation_by_city(df2):
-    df_aux = df2[['time_taken(min)', 'city', 'road_traffic_density']].groupby(['city', 'road_traffic_density']).agg({'time_taken(min)': ['mean', 'std']})
-    df_aux.columns = ['time_mean', 'time_std']
-    df_aux = df_aux.reset_index()
-    df_aux = df_aux.groupby('city').apply(lambda x: x.sort_values('time_mean', ascending= False)).reset_index(drop=True)
-
-    fig = px.sunburst(df_aux, path=['city', 'road_traffic_density'], values= 'time_mean',
-        color= 'time_std', color_continuous_scale='RdBu_r', 
-        color_continuous_midpoint= np.average(df_aux['time_std']))
-    return fig
+# Hot path timings of this rerun (utils/metrics.py)
+start_run('restaurant_view')
 
 # ------------------------------- Logical Structure ------------------------------
 
-# Import Dataset
-df_raw = pd.read_csv('train.csv')
-df1 = df_raw.copy()
-
-# Cleaning Dataset
-df1 = clean_data(df1)
-
-df2 = df1.copy()
+# Import Dataset as pre-aggregated cube, delivery time and deliverer sketches (cached per process). The
+# version is read first so a background swap during this rerun cannot cache newer charts under an older key.
+# The spatial index is loaded with df1, whose row positions it is queried with
+version = dataset_version()
+cube, persons = load_cube()
+sketch = load_sketch()
+distinct = load_distinct()
+df1 = load_data(columns=COLUMNS)
+spatial = load_spatial()
 
 
 # =========================
 # Sidebar Layoyt
 # =========================
 
-img = Image.open('logo.jpg')
-st.sidebar.image(img, width=120)
+sidebar_logo()
 
 st.sidebar.markdown('# India Delivery')
 st.sidebar.markdown('## Best delivery in town')
+st.sidebar.caption('Data: {}'.format(dataset_label()))
 st.sidebar.markdown("""___""")
 
-# Date Input
-date_slider = st.sidebar.slider('Select a date', 
-                    value= datetime(2022, 4, 13),
-                    min_value= datetime(2022, 2, 11), 
-                    max_value= datetime(2022, 4, 6), 
+# Date Input (start and end days included), over the days of the loaded data
+first_day, last_day = date_limits(cube)
+date_range = st.sidebar.slider('Select a date range', 
+                    value= (first_day, last_day),
+                    min_value= first_day, 
+                    max_value= last_day, 
                     format=('DD-MM-YYYY'))
 
 st.sidebar.markdown("""___""")
@@ -158,17 +69,16 @@ weather_condition = st.sidebar.multiselect('Weather Condition', ['conditions Sun
 # Linking Filter
 # =========================
 
-# Date Filter
-selected_lines= df2['order_date'] < date_slider
-df2 = df2.loc[selected_lines, :]
-
-# Traffic Filter
-selected_lines = df2['road_traffic_density'].isin(traffic_condition)
-df2 = df2.loc[selected_lines, :]
+# Chart cache key of this rerun: dataset version and normalized filters (utils/memo.py)
+state = (version, filter_state(date_range, traffic_condition, weather_condition))
 
-# Weather Filter
-selected_lines = df2['weatherconditions'].isin(weather_condition)
-df2 = df2.loc[selected_lines, :]
+# Date range, Traffic and Weather Filters on the cube in a single selection (utils/filters.py),
+# applied only when a chart is not cached yet
+cube2 = lazy(apply_filters, cube, date_range, traffic_condition, weather_condition)
+distinct2 = lazy(select_sketch, distinct, persons, date_range, traffic_condition, weather_condition)
+df2 = lazy(apply_filters, df1, date_range, traffic_condition, weather_condition)
+positions = lazy(select, df1, date_range, traffic_condition, weather_condition)
+sketch2 = lazy(apply_filters, sketch, date_range, traffic_condition, weather_condition)
 
 # =========================
 # Streamlit Layoyt
@@ -181,20 +91,32 @@ with st.container():
 
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric('Deliverers', df2['delivery_person_id'].nunique())
+        st.metric('Deliverers', cached(state + ('deliverers',), lambda: count_distinct(distinct2())))
 
     with col2:
-        avg_distance = distance(df2)
+        avg_distance = cached(state + ('distance',), lambda: distance(cube2()))
         st.metric('Average Distance Km', avg_distance)
 
     with col3:
-        df_aux = delivery_time_festival(df2, 'Yes')
+        df_aux = cached(state + ('festival', 'Yes'), lambda: delivery_time_festival(cube2(), 'Yes'))
         st.metric('Delivery Time - Festival', df_aux)
         
     with col4:
-        df_aux = delivery_time_festival(df2, 'No')
+        df_aux = cached(state + ('festival', 'No'), lambda: delivery_time_festival(cube2(), 'No'))
         st.metric('Delivery Time - No Festival', df_aux)
 
+    # Percentiles of the delivery time from the sketch (utils/sketch.py)
+    percentiles = cached(state + ('percentiles',), lambda: delivery_time_percentiles(sketch2()))
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric('Delivery Time - p50', percentiles['p50'])
+
+    with col2:
+        st.metric('Delivery Time - p90', percentiles['p90'])
+
+    with col3:
+        st.metric('Delivery Time - p99', percentiles['p99'])
+
 
 with st.container():
     st.markdown("""___""")
@@ -202,12 +124,12 @@ with st.container():
 
     with col1:
         st.header('Average Delivery Time by City')
-        fig = avg_delivery_city(df2)
+        fig = cached(state + ('avg_delivery_city',), lambda: avg_delivery_city(cube2()))
         st.plotly_chart(fig, use_container_width=True)
         
     with col2:
         st.header('Delivery Time by Order Type')
-        df_aux = avg_delivery_order_type(df2)
+        df_aux = cached(state + ('avg_delivery_order_type',), lambda: avg_delivery_order_type(cube2()))
         st.dataframe(df_aux, use_container_width=True)
 
 
@@ -217,18 +139,50 @@ with st.container():
     col1, col2 = st.columns(2)
     with col1:
         st.header('Mean delivery time by City')
-        fig = avg_delivery_by_city(df2)
+        fig = cached(state + ('avg_delivery_by_city',), lambda: avg_delivery_by_city(cube2()))
         st.plotly_chart(fig, use_container_width=True)
         
 
     with col2:
         st.header('Standard Deviation by City and Traffic')
-        fig = avg_deviation_by_city(df2)
+        fig = cached(state + ('avg_deviation_by_city',), lambda: avg_deviation_by_city(cube2()))
         st.plotly_chart(fig, use_container_width=True)
 
 
-        
+with st.container():
+    st.markdown("""___""")
 
-        
-        
-    
\ No newline at end of file
+    col1, col2 = st.columns(2)
+    with col1:
+        st.header('Delivery Time Percentiles by City and Traffic')
+        fig = cached(state + ('percentiles_by_city_traffic',), lambda: percentiles_by_city_traffic(sketch2()))
+        st.plotly_chart(fig, use_container_width=True)
+
+    with col2:
+        st.header('Delivery Time Percentiles by Festival and Order Type')
+        df_aux = cached(state + ('percentiles_by_festival_order_type',),
+                        lambda: percentiles_by_festival_order_type(sketch2()))
+        st.dataframe(df_aux, use_container_width=True)
+
+
+with st.container():
+    st.markdown("""___""")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.header('Delivery Time by Distance')
+        df_aux = cached(state + ('delivery_time_by_distance',), lambda: delivery_time_by_distance(df2()))
+        fig = cached(state + ('distance_band_chart',), lambda: distance_band_chart(df_aux))
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(df_aux, use_container_width=True)
+
+    with col2:
+        # Grid index of the restaurant and delivery locations (utils/spatial.py)
+        st.header('Restaurants Nearest the Busiest Area')
+        df_aux = cached(state + ('nearest_restaurants',),
+                        lambda: nearest_restaurants(spatial, df2(), positions()))
+        st.caption('Orders within radius: selected orders delivered within 5 km of the restaurant')
+        st.dataframe(df_aux, use_container_width=True)
+
+
+debug_panel(finish_run())
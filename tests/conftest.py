@@ -0,0 +1,45 @@
+# Imports
+import pytest
+
+from benchmarks.synthetic import write_csv
+
+# =========================
+# FIXTURES
+# =========================
+# Cleaned synthetic data shaped like train.csv (benchmarks/synthetic.py),
+# built once per test session. Frames are shared: tests must not modify them.
+
+ROWS = 5000
+
+
+@pytest.fixture(scope='session')
+def csv_path(tmp_path_factory):
+    return write_csv(ROWS, str(tmp_path_factory.mktemp('data') / 'train.csv'))
+
+
+@pytest.fixture(scope='session')
+def df1(csv_path):
+    from utils.data import read_clean_csv
+
+    return read_clean_csv(csv_path)
+
+
+@pytest.fixture(scope='session')
+def cube(df1):
+    from utils.cube import build_cube
+
+    return build_cube(df1)[0]
+
+
+@pytest.fixture(scope='session')
+def persons(df1):
+    from utils.cube import build_cube
+
+    return build_cube(df1)[1]
+
+
+@pytest.fixture(scope='session')
+def sketch(df1):
+    from utils.sketch import build_sketch
+
+    return build_sketch(df1)
@@ -0,0 +1,25 @@
+# Imports
+import numpy as np
+import pytest
+
+from utils.cube import extremes, order_count, rollup, total_mean
+
+MEASURES = {'time': 'time_taken(min)', 'rating': 'delivery_person_ratings', 'distance': 'distance_km'}
+
+
+@pytest.mark.parametrize('by', [['city'], ['city', 'road_traffic_density'], ['festival', 'type_of_order']])
+@pytest.mark.parametrize('measure', list(MEASURES))
+def test_rollup_matches_pandas(df1, cube, by, measure):
+    df_aux = rollup(cube, by, measure)
+    expected = df1.groupby(by, observed=True)[MEASURES[measure]].agg(['mean', 'std']).reset_index()
+    np.testing.assert_allclose(df_aux[measure + '_mean'], expected['mean'], rtol=1e-6)
+    np.testing.assert_allclose(df_aux[measure + '_std'], expected['std'], rtol=1e-4)
+
+
+def test_order_count_total_mean_extremes(df1, cube):
+    counts = order_count(cube, 'road_traffic_density').set_index('road_traffic_density')['count']
+    expected = df1['road_traffic_density'].value_counts()
+    assert (counts == expected[counts.index]).all()
+
+    assert total_mean(cube, 'time') == pytest.approx(df1['time_taken(min)'].mean())
+    assert extremes(cube, 'age') == (df1['delivery_person_age'].min(), df1['delivery_person_age'].max())
@@ -0,0 +1,62 @@
+# Imports
+import numpy as np
+import pytest
+
+from utils import distinct
+from utils.distinct import build_sketch, count_distinct, count_distinct_by, estimate, select_sketch
+
+SELECTIONS = [
+    (('2022-02-11', '2022-04-06'), ['Jam', 'High', 'Low', 'Medium'],
+     ['conditions Sunny', 'conditions Stormy', 'conditions Sandstorms', 'conditions Cloudy', 'conditions Fog',
+      'conditions Windy']),
+    (('2022-03-01', '2022-03-14'), ['Jam', 'Low'], ['conditions Fog', 'conditions Sunny', 'conditions Windy']),
+]
+
+
+@pytest.fixture(scope='module')
+def hll(persons):
+    return build_sketch(persons)
+
+
+def _error_bound(count):
+    # Three standard errors of the estimate, at least one person
+    return max(3 * 1.04 / np.sqrt(2 ** distinct.PRECISION) * count, 1)
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_hll_count_within_error(monkeypatch, persons, hll, selection):
+    from utils.filters import apply_filters
+
+    monkeypatch.setattr(distinct, 'MODE', 'hll')
+    sketch2 = select_sketch(hll, persons, *selection)
+    assert 'registers' in sketch2
+
+    expected = apply_filters(persons, *selection)['delivery_person_id'].nunique()
+    assert abs(count_distinct(sketch2) - expected) <= _error_bound(expected)
+
+
+def test_hll_count_by_week(monkeypatch, persons, hll):
+    monkeypatch.setattr(distinct, 'MODE', 'hll')
+    df_aux = count_distinct_by(select_sketch(hll, persons, *SELECTIONS[0]), 'week_of_year')
+    expected = persons.groupby('week_of_year', observed=True)['delivery_person_id'].nunique()
+
+    np.testing.assert_array_equal(df_aux['week_of_year'], expected.index)
+    for estimate_, exact in zip(df_aux['delivery_person_id'], expected):
+        assert abs(estimate_ - exact) <= _error_bound(exact)
+
+
+def test_exact_mode_is_nunique(monkeypatch, persons, hll):
+    monkeypatch.setattr(distinct, 'MODE', 'exact')
+    sketch2 = select_sketch(hll, persons, *SELECTIONS[1])
+    assert 'persons' in sketch2
+    assert count_distinct(sketch2) == sketch2['persons']['delivery_person_id'].nunique()
+
+
+def test_merged_registers_equal_sketch_of_union(persons):
+    # The register-wise max of two halves is the sketch of the whole
+    half = len(persons) // 2
+    whole = build_sketch(persons)['registers'].max(axis=0)
+    halves = np.maximum(build_sketch(persons.iloc[:half])['registers'].max(axis=0),
+                        build_sketch(persons.iloc[half:])['registers'].max(axis=0))
+    np.testing.assert_array_equal(whole, halves)
+    assert estimate(whole)[0] == estimate(halves)[0]
@@ -0,0 +1,100 @@
+# Imports
+import pytest
+
+from utils import distinct
+from utils.filters import apply_filters, select
+
+# Clearing the traffic multiselect selects nothing
+EMPTY = (('2022-02-11', '2022-04-06'), [], ['conditions Sunny'])
+
+
+@pytest.fixture(scope='module')
+def empty(df1, cube, persons, sketch):
+    return {'df2': apply_filters(df1, *EMPTY), 'cube2': apply_filters(cube, *EMPTY),
+            'persons2': apply_filters(persons, *EMPTY), 'sketch2': apply_filters(sketch, *EMPTY),
+            'positions': select(df1, *EMPTY)}
+
+
+def test_filters_select_nothing(empty):
+    assert empty['df2'].empty and empty['cube2'].empty and not len(empty['positions'])
+
+
+def test_cube_tables(empty):
+    from utils.cube import order_count, rollup
+    from utils.delivery_person import rating_per_traffic, rating_per_weather
+    from utils.restaurant import avg_delivery_order_type
+
+    assert order_count(empty['cube2'], 'city').empty
+    assert rollup(empty['cube2'], ['city', 'road_traffic_density'], 'time').empty
+    assert rating_per_traffic(empty['cube2']).empty
+    assert rating_per_weather(empty['cube2']).empty
+    assert avg_delivery_order_type(empty['cube2']).empty
+
+
+def test_row_tables(df1, empty):
+    from utils.delivery_person import rating_per_person
+    from utils.restaurant import delivery_time_by_distance, nearest_restaurants
+    from utils.spatial import build_spatial
+
+    assert rating_per_person(empty['df2']).empty
+    assert delivery_time_by_distance(empty['df2']).empty
+    assert nearest_restaurants(build_spatial(df1), empty['df2'], empty['positions']).empty
+
+
+def test_top_deliverers(empty):
+    from utils.delivery_person import top_deliverers
+
+    for df_aux in top_deliverers(empty['df2'], 10):
+        assert df_aux.empty
+        assert list(df_aux.columns) == ['city', 'delivery_person_id', 'time_taken(min)']
+
+
+def test_festival_metrics(cube, empty):
+    from utils.restaurant import delivery_time_festival
+
+    assert all(delivery_time_festival(empty['cube2'], festival) != delivery_time_festival(empty['cube2'], festival)
+               for festival in ('Yes', 'No'))
+    # A selection without festival orders still has a no festival mean
+    cube2 = cube[cube['festival'] == 'No']
+    assert delivery_time_festival(cube2, 'Yes') != delivery_time_festival(cube2, 'Yes')
+    assert isinstance(delivery_time_festival(cube2, 'No'), float)
+
+
+def test_sketch_tables(empty):
+    from utils.restaurant import delivery_time_percentiles, percentiles_by_festival_order_type
+    from utils.sketch import quantiles
+
+    assert quantiles(empty['sketch2'], ['city']).empty
+    assert percentiles_by_festival_order_type(empty['sketch2']).empty
+    assert all(value != value for value in delivery_time_percentiles(empty['sketch2']).values())
+
+
+@pytest.mark.parametrize('mode', ['exact', 'hll'])
+def test_distinct_counts(monkeypatch, persons, mode):
+    monkeypatch.setattr(distinct, 'MODE', mode)
+    sketch2 = distinct.select_sketch(distinct.build_sketch(persons), persons, *EMPTY)
+    assert distinct.count_distinct(sketch2) == 0
+    assert distinct.count_distinct_by(sketch2, 'week_of_year').empty
+
+
+def test_time_series(empty):
+    from utils.timeseries import daily_orders, hourly_orders
+
+    assert daily_orders(empty['cube2'], empty['persons2']).empty
+    assert hourly_orders(empty['df2'])['orders'].sum() == 0
+
+
+def test_charts(monkeypatch, persons, empty):
+    from utils import business, restaurant
+
+    monkeypatch.setattr(distinct, 'MODE', 'hll')
+    distinct2 = distinct.select_sketch(distinct.build_sketch(persons), persons, *EMPTY)
+    cube2 = empty['cube2']
+    for chart in (business.order_metric, business.order_distribution_traffic, business.traffic_order_city,
+                  business.order_by_week, restaurant.avg_delivery_city, restaurant.avg_delivery_by_city,
+                  restaurant.avg_deviation_by_city):
+        assert chart(cube2) is not None
+    assert business.delivery_person_by_week(cube2, distinct2) is not None
+    assert business.delivery_person_rolling(cube2, empty['persons2']) is not None
+    assert restaurant.percentiles_by_city_traffic(empty['sketch2']) is not None
+    assert restaurant.distance_band_chart(restaurant.delivery_time_by_distance(empty['df2'])) is not None
@@ -0,0 +1,63 @@
+# Imports
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.filters import apply_filters, date_limits, select
+
+TRAFFIC = ['Jam', 'High', 'Low', 'Medium']
+WEATHER = ['conditions Sunny', 'conditions Stormy', 'conditions Sandstorms', 'conditions Cloudy',
+           'conditions Fog', 'conditions Windy']
+
+# (date_range, traffic_condition, weather_condition)
+SELECTIONS = [
+    (('2022-02-11', '2022-04-06'), TRAFFIC, WEATHER),
+    (('2022-02-20', '2022-03-05'), TRAFFIC, WEATHER),
+    (('2022-03-01', '2022-03-01'), ['Jam'], WEATHER),
+    (('2022-02-11', '2022-04-06'), ['Low', 'High'], ['conditions Fog']),
+    (('2022-03-10', '2022-03-25'), ['Medium'], ['conditions Sunny', 'conditions Windy']),
+    (('2022-02-11', '2022-04-06'), [], WEATHER),
+    (('2022-02-11', '2022-04-06'), TRAFFIC, []),
+    (('2023-01-01', '2023-02-01'), TRAFFIC, WEATHER),
+]
+
+
+def expected_positions(frame, date_range, traffic_condition, weather_condition):
+    # The filters as boolean masks
+    start, end = (pd.Timestamp(d) for d in date_range)
+    mask = ((frame['order_date'] >= start) & (frame['order_date'] < end + pd.Timedelta(days=1))
+            & frame['road_traffic_density'].isin(traffic_condition)
+            & frame['weatherconditions'].isin(weather_condition))
+    return np.flatnonzero(mask.to_numpy())
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_select_matches_masks(df1, cube, selection):
+    for frame in (df1, cube):
+        np.testing.assert_array_equal(select(frame, *selection), expected_positions(frame, *selection))
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_select_unsorted_frame(df1, selection):
+    shuffled = df1.sample(frac=1.0, random_state=0).reset_index(drop=True)
+    np.testing.assert_array_equal(select(shuffled, *selection), expected_positions(shuffled, *selection))
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_apply_filters_rows(df1, selection):
+    df2 = apply_filters(df1, *selection)
+    pd.testing.assert_frame_equal(df2.reset_index(drop=True),
+                                  df1.take(expected_positions(df1, *selection)).reset_index(drop=True))
+
+
+def test_date_limits(df1, cube):
+    for frame in (df1, cube):
+        first, last = date_limits(frame)
+        assert (first, last) == (frame['order_date'].min().normalize(), frame['order_date'].max().normalize())
+        # The default selection leaves no day out
+        np.testing.assert_array_equal(select(frame, (first, last), TRAFFIC, WEATHER),
+                                      select(frame, ('2000-01-01', '2100-01-01'), TRAFFIC, WEATHER))
+
+    # One day of data: the slider still gets two different days
+    first, last = date_limits(cube[cube['order_date'] == cube['order_date'].min()])
+    assert last - first == pd.Timedelta(days=1)
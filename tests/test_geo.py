@@ -0,0 +1,50 @@
+# Imports
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import geo
+
+
+@pytest.mark.parametrize('chunk_rows', [1000, 1 << 18])
+def test_grid_bins_match_groupby(monkeypatch, df1, chunk_rows):
+    monkeypatch.setattr(geo, 'GRID_CHUNK_ROWS', chunk_rows)
+    lat, lon = df1['delivery_location_latitude'], df1['delivery_location_longitude']
+    cells, cell_deg = geo.grid_bins(lat, lon, df1['time_taken(min)'], cell_deg=0.01, max_cells=10**6)
+
+    points = pd.DataFrame({'row': np.floor(lat.astype('float64') / 0.01), 'col': np.floor(lon.astype('float64') / 0.01),
+                           'latitude': lat.astype('float64'), 'longitude': lon.astype('float64'),
+                           'time': df1['time_taken(min)'].astype('float64')})
+    expected = points.groupby(['row', 'col']).agg(latitude=('latitude', 'mean'), longitude=('longitude', 'mean'),
+                                                  count=('time', 'size'), time_mean=('time', 'mean'))
+    assert cell_deg == 0.01
+    np.testing.assert_array_equal(cells['count'], expected['count'])
+    for col in ('latitude', 'longitude', 'time_mean'):
+        np.testing.assert_allclose(cells[col], expected[col], rtol=1e-9)
+
+
+def test_grid_bins_merge_cells(monkeypatch, df1):
+    monkeypatch.setattr(geo, 'GRID_CHUNK_ROWS', 1000)
+    cells, cell_deg = geo.grid_bins(df1['delivery_location_latitude'], df1['delivery_location_longitude'],
+                                    df1['time_taken(min)'], cell_deg=0.01, max_cells=50)
+    assert len(cells) <= 50 and cell_deg > 0.01
+    assert cells['count'].sum() == len(df1)
+    np.testing.assert_allclose((cells['time_mean'] * cells['count']).sum(), df1['time_taken(min)'].sum())
+
+
+def test_grid_bins_no_points():
+    cells, _ = geo.grid_bins(np.zeros(0, 'float32'), np.zeros(0, 'float32'), np.zeros(0, 'int8'))
+    assert cells.empty
+
+
+def test_city_centers_match_groupby_median(df1):
+    from utils.business import city_centers
+
+    columns = ['city', 'road_traffic_density', 'delivery_location_latitude', 'delivery_location_longitude']
+    expected = df1[columns].groupby(['city', 'road_traffic_density'], observed=True).median().reset_index()
+    df_aux = city_centers(df1)
+    assert (df_aux['city'].astype(str) == expected['city'].astype(str)).all()
+    assert (df_aux['road_traffic_density'].astype(str) == expected['road_traffic_density'].astype(str)).all()
+    for col in columns[2:]:
+        np.testing.assert_allclose(df_aux[col], expected[col].astype('float64'), rtol=1e-6)
+    assert city_centers(df1.iloc[:0]).empty
@@ -0,0 +1,38 @@
+# Imports
+import pandas as pd
+import plotly.express as px
+import pytest
+
+from utils import memo
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(memo, 'MAX_BYTES', 100000)
+    memo.clear()
+    yield memo
+    memo.clear()
+
+
+def test_figure_size_follows_its_data():
+    small = px.bar(pd.DataFrame({'x': range(10), 'y': range(10)}), x='x', y='y')
+    large = px.bar(pd.DataFrame({'x': range(10000), 'y': range(10000)}), x='x', y='y')
+    assert memo._size(small) > 1000
+    assert memo._size(large) > 5 * memo._size(small)
+
+
+def test_dict_size_counts_values():
+    frame = pd.DataFrame({'x': range(1000)})
+    assert memo._size({'a': frame, 'b': 'text'}) >= memo._size(frame) + 4
+
+
+def test_figures_are_evicted_by_size(cache):
+    fig = px.line(pd.DataFrame({'x': range(5000), 'y': range(5000)}), x='x', y='y')
+    size = memo._size(fig)
+    for i in range(8):
+        cache.cached(('fig', i), lambda: fig)
+
+    stats = cache.stats()
+    assert stats['entries'] == 100000 // size
+    assert stats['bytes'] == stats['entries'] * size <= 100000
+    assert stats['evictions'] == 8 - stats['entries']
@@ -0,0 +1,24 @@
+# Imports
+import json
+
+from utils import metrics
+
+
+def test_finish_run_appends_only_the_run(monkeypatch, tmp_path):
+    # The summary is left to the exporter thread, not started here
+    monkeypatch.setattr(metrics, 'METRICS_DIR', str(tmp_path))
+    monkeypatch.setattr(metrics, '_exporter', object())
+    for _ in range(3):
+        metrics.start_run('test_page')
+        with metrics.stage('block'):
+            pass
+        metrics.finish_run()
+
+    lines = (tmp_path / 'runs.jsonl').read_text().splitlines()
+    assert [json.loads(line)['page'] for line in lines] == ['test_page'] * 3
+    assert not (tmp_path / 'metrics.prom').exists()
+
+    metrics.write_prometheus(str(tmp_path))
+    text = (tmp_path / 'metrics.prom').read_text()
+    assert 'india_delivery_rerun_seconds_count{page="test_page"} ' in text
+    assert 'india_delivery_stage_seconds_count{page="test_page",stage="block"} ' in text
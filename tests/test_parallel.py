@@ -0,0 +1,22 @@
+# Imports
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from utils import parallel
+
+pytestmark = pytest.mark.skipif('forkserver' not in multiprocessing.get_all_start_methods(),
+                                reason='the worker pool needs the forkserver start method')
+
+
+@pytest.mark.parametrize('by, column', [(['city', 'delivery_person_id'], 'time_taken(min)'),
+                                        (['delivery_person_id'], 'delivery_person_ratings')])
+def test_group_sums_match_pandas(monkeypatch, df1, by, column):
+    monkeypatch.setattr(parallel, 'WORKERS', 3)
+    df_aux = parallel.group_sums(df1, by, [column])
+    expected = df1.groupby(by, observed=True)[column].agg(['count', 'sum'])
+
+    assert df_aux.index.equals(expected.index)
+    np.testing.assert_array_equal(df_aux[column + '_count'], expected['count'])
+    np.testing.assert_allclose(df_aux[column + '_sum'], expected['sum'])
@@ -0,0 +1,25 @@
+# Imports
+import numpy as np
+import pytest
+
+from utils.sketch import PERCENTILES, TIME, quantiles
+
+
+@pytest.mark.parametrize('by', [[], ['city'], ['city', 'road_traffic_density'], ['festival', 'type_of_order']])
+def test_quantiles_match_pandas(df1, sketch, by):
+    df_aux = quantiles(sketch, by)
+    for name, q in PERCENTILES.items():
+        if by:
+            expected = df1.groupby(by, observed=True)[TIME].quantile(q).to_numpy()
+        else:
+            expected = [df1[TIME].quantile(q)]
+        np.testing.assert_allclose(df_aux[name].to_numpy(dtype='float64'), expected)
+
+
+def test_quantiles_of_a_filtered_sketch(df1, sketch):
+    from utils.filters import apply_filters
+
+    selection = (('2022-03-01', '2022-03-10'), ['Jam', 'Low'], ['conditions Fog', 'conditions Sunny'])
+    df_aux = quantiles(apply_filters(sketch, *selection), ['city'])
+    expected = apply_filters(df1, *selection).groupby('city', observed=True)[TIME].quantile(0.9)
+    np.testing.assert_allclose(df_aux['p90'].to_numpy(dtype='float64'), expected.to_numpy())
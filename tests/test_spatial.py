@@ -0,0 +1,59 @@
+# Imports
+import numpy as np
+import pytest
+
+from utils.geo import haversine_km
+from utils.spatial import build_index, nearest, radius_count, radius_query
+
+
+@pytest.fixture(scope='module')
+def points(df1):
+    lat = df1['delivery_location_latitude'].to_numpy(dtype='float64')
+    lon = df1['delivery_location_longitude'].to_numpy(dtype='float64')
+    return lat, lon, build_index(lat, lon)
+
+
+# Inside the data, next to it, and far away (the search box wraps around the globe)
+QUERIES = [(12.97, 77.59), (22.57, 88.36), (19.08, 72.88), (0.0, 0.0), (-40.0, -100.0), (60.0, -120.0)]
+
+
+@pytest.mark.parametrize('radius_km', [1.0, 5.0, 25.0])
+def test_radius_query_matches_brute_force(points, radius_km):
+    lat, lon, index = points
+    q_lat, q_lon = np.array(QUERIES).T
+    found = radius_query(index, q_lat, q_lon, radius_km)
+    for i in range(len(QUERIES)):
+        distance = haversine_km(q_lat[i], q_lon[i], lat, lon)
+        expected = np.flatnonzero(distance <= radius_km)
+        np.testing.assert_array_equal(np.sort(found.loc[found['query'] == i, 'position']), expected)
+    np.testing.assert_array_equal(radius_count(index, q_lat, q_lon, radius_km),
+                                  [np.sum(haversine_km(a, b, lat, lon) <= radius_km) for a, b in QUERIES])
+
+
+def test_radius_query_mask(points):
+    lat, lon, index = points
+    mask = np.arange(len(lat)) % 2 == 0
+    found = radius_query(index, [12.97], [77.59], 10.0, mask)
+    assert len(found) and mask[found['position']].all()
+
+
+@pytest.mark.parametrize('k', [1, 5, 20])
+def test_nearest_matches_brute_force(points, k):
+    lat, lon, index = points
+    for q_lat, q_lon in QUERIES:
+        found = nearest(index, [q_lat], [q_lon], k)
+        expected = np.sort(haversine_km(q_lat, q_lon, lat, lon))[:k]
+        np.testing.assert_allclose(found['distance_km'], expected)
+
+
+def test_queries_across_the_antimeridian():
+    lat = np.array([10.0, 10.0, 10.0, 10.2, -10.0, 89.9])
+    lon = np.array([179.95, -179.95, 0.0, -179.8, 179.0, 0.0])
+    index = build_index(lat, lon)
+    for q_lat, q_lon, radius_km in [(10.0, 179.99, 50.0), (10.0, -179.99, 50.0), (89.95, 180.0, 20.0)]:
+        found = radius_query(index, [q_lat], [q_lon], radius_km)
+        expected = np.flatnonzero(haversine_km(q_lat, q_lon, lat, lon) <= radius_km)
+        np.testing.assert_array_equal(np.sort(found['position']), expected)
+    for k in range(1, len(lat) + 1):
+        found = nearest(index, [10.0], [-179.99], k)
+        np.testing.assert_allclose(found['distance_km'], np.sort(haversine_km(10.0, -179.99, lat, lon))[:k])
@@ -0,0 +1,55 @@
+# Imports
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_raw
+from utils import snapshot, store
+from utils.streaming import update_moments
+
+pytestmark = pytest.mark.skipif(not snapshot.available(), reason='the store needs pyarrow')
+
+
+@pytest.fixture
+def empty_drops(tmp_path):
+    # A header only drop and a drop where every row has a 'NaN ' sentinel
+    header = tmp_path / 'header.csv'
+    make_raw(0).to_csv(header, index=False)
+    sentinels = tmp_path / 'sentinels.csv'
+    make_raw(20, seed=1).assign(City='NaN ').to_csv(sentinels, index=False)
+    return [str(header), str(sentinels)]
+
+
+@pytest.mark.parametrize('chunksize', [None, 1000])
+def test_ingest_empty_drops(tmp_path, csv_path, df1, empty_drops, chunksize):
+    path = str(tmp_path / 'store')
+    store.ingest_file(csv_path, path, chunksize)
+    moments = store.read_moments(path)
+
+    for drop in empty_drops:
+        entry = store.ingest_file(drop, path, chunksize)
+        assert entry['rows'] == 0 and entry['partitions'] == []
+
+    assert len(store.read_store(path, ['order_date'])) == len(df1)
+    cube, persons = store.read_store_cube(path)
+    assert cube['count'].sum() == len(df1)
+    # The stored partials come back with the dtypes build_cube gives them
+    from utils.cube import build_cube
+    expected_cube, expected_persons = build_cube(df1)
+    pd.testing.assert_series_equal(cube.dtypes, expected_cube.dtypes)
+    pd.testing.assert_series_equal(persons.dtypes, expected_persons.dtypes)
+    assert store.read_store_sketch(path)['count'].sum() == df1['time_taken(min)'].notna().sum()
+    for name, table in store.read_moments(path).items():
+        pd.testing.assert_frame_equal(table, moments[name])
+
+
+def test_store_without_rows(tmp_path, empty_drops):
+    path = str(tmp_path / 'store')
+    for drop in empty_drops:
+        store.ingest_file(drop, path)
+    assert store.read_moments(path) is None
+
+
+def test_empty_chunk_moments(df1):
+    moments = update_moments(None, df1)
+    assert update_moments(moments, df1.iloc[:0]) is moments
+    assert update_moments(None, df1.iloc[:0]) is None
@@ -0,0 +1,24 @@
+# Imports
+import numpy as np
+import pytest
+
+from utils.streaming import GROUPS, MEASURES, summary, update_moments
+
+
+@pytest.mark.parametrize('name', list(GROUPS))
+def test_chunked_moments_match_pandas(df1, name):
+    moments = None
+    for chunk in np.array_split(np.arange(len(df1)), 7):
+        moments = update_moments(moments, df1.iloc[chunk])
+
+    by = GROUPS[name]
+    for col, measure in MEASURES.items():
+        df_aux = summary(moments[name], by, measure)
+        if by:
+            expected = df1.groupby(by, observed=True)[col].agg(['count', 'mean', 'std'])
+            df_aux = df_aux.set_index(by).loc[expected.index.astype(str)]
+        else:
+            expected = df1[col].agg(['count', 'mean', 'std']).to_frame().T
+        np.testing.assert_array_equal(df_aux['count'], expected['count'])
+        np.testing.assert_allclose(df_aux['mean'], expected['mean'], rtol=1e-9)
+        np.testing.assert_allclose(df_aux['std'], expected['std'], rtol=1e-9)
@@ -0,0 +1,38 @@
+# Imports
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.filters import apply_filters
+from utils.timeseries import daily_orders, orders_between
+
+SELECTION = (('2022-02-15', '2022-03-31'), ['Jam', 'High', 'Low'], ['conditions Sunny', 'conditions Fog',
+                                                                   'conditions Cloudy', 'conditions Windy'])
+
+
+@pytest.fixture(scope='module')
+def series(df1, cube, persons):
+    return apply_filters(df1, *SELECTION), daily_orders(apply_filters(cube, *SELECTION),
+                                                         apply_filters(persons, *SELECTION))
+
+
+def test_daily_orders(series):
+    df2, df_aux = series
+    expected = df2.groupby('order_date').size()
+    counts = df_aux.set_index('order_date')['orders']
+    assert (counts[expected.index] == expected).all()
+    assert counts.sum() == len(df2)
+    assert orders_between(df_aux, '2022-03-01', '2022-03-07') == len(
+        apply_filters(df2, ('2022-03-01', '2022-03-07'), SELECTION[1], SELECTION[2]))
+
+
+@pytest.mark.parametrize('window', [7, 28])
+def test_rolling_deliveries_per_distinct_person(series, window):
+    df2, df_aux = series
+    for row in df_aux.iloc[::5].itertuples(index=False):
+        start = row.order_date - pd.Timedelta(days=window - 1)
+        rows = df2[(df2['order_date'] >= start) & (df2['order_date'] <= row.order_date)]
+        assert getattr(row, 'orders_{}d'.format(window)) == len(rows)
+        assert getattr(row, 'persons_{}d'.format(window)) == rows['delivery_person_id'].nunique()
+        np.testing.assert_allclose(getattr(row, 'deliveries_per_person_{}d'.format(window)),
+                                   len(rows) / rows['delivery_person_id'].nunique())
@@ -0,0 +1,42 @@
+# Imports
+import functools
+import io
+
+# =========================
+# STATIC ASSETS
+# =========================
+# Images shared by every page, decoded once per process. st.image decodes
+# and re-encodes whatever it is given on every rerun unless it gets bytes
+# already in its output format and no wider than the displayed width, so
+# those bytes are what is cached. It resizes anything wider than an integer
+# width down to that width, so the logo is shown in a fixed width container
+# instead: the image keeps twice the pixels and stays sharp on HiDPI screens.
+
+LOGO_PATH = 'logo.jpg'
+
+
+@functools.cache
+def logo(width=120, path=LOGO_PATH):
+    """
+    The logo as lossless PNG bytes, 2 * width pixels wide, to be shown width
+    pixels wide (sidebar_logo)
+    """
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img = img.convert('RGB')
+        if img.width > 2 * width:
+            img = img.resize((2 * width, round(img.height * 2 * width / img.width)), Image.LANCZOS)
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def sidebar_logo(width=120):
+    """
+    The logo at the top of the sidebar, width pixels wide
+    """
+    import streamlit as st
+
+    with st.sidebar.container(width=width):
+        st.image(logo(width), width='stretch', output_format='PNG')
@@ -0,0 +1,166 @@
+# Imports
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from utils.cube import order_count
+from utils.distinct import count_distinct_by
+from utils.geo import grid_bins
+from utils.metrics import timed
+from utils.timeseries import daily_orders, weekly_orders
+
+# =========================
+# BUSINESS VIEW
+# =========================
+# Charts of pages/1_business_view.py, importable by the benchmarks and scripts
+
+# Map grid: starting cell size in degrees (~1 km) and maximum cells per layer
+GRID_CELL_DEG = 0.01
+MAX_MAP_CELLS = 500
+
+
+@timed
+def order_metric(cube2):
+    # 2.1.1 Quantity orders per day
+    df_aux = order_count(cube2, 'order_date')
+    fig = px.bar(df_aux, x='order_date', y='count')
+
+    return fig
+
+
+def traffic_distribution(cube2):
+    # Orders and share of orders per traffic density
+    df_aux = order_count(cube2, 'road_traffic_density').rename(columns={'count': 'id'})
+    df_aux['percentage'] = df_aux['id'] / df_aux['id'].sum() * 100
+    return df_aux
+
+
+@timed
+def order_distribution_traffic(cube2):
+    # 2.1.3 Orders distribution per traffic
+    df_aux = traffic_distribution(cube2)
+    fig = px.pie(df_aux, names= 'road_traffic_density',values='percentage')
+    return fig
+
+
+@timed
+def traffic_order_city(cube2):
+    # 2.1.4 Comparison of order volume by city and traffic
+    df_aux = order_count(cube2, ['city', 'road_traffic_density']).rename(columns={'count': 'id'})
+    fig = px.scatter(df_aux, x='city', y='road_traffic_density', size='id', color='city')
+    return fig
+
+
+def orders_per_week(cube2):
+    # Orders per week of year, from the daily counts over the calendar (utils/timeseries.py)
+    return weekly_orders(cube2, 'week_of_year').rename(columns={'orders': 'id'})
+
+
+@timed
+def order_by_week(cube2):
+    # 2.1.2 Quantity orders per week
+    df_aux = orders_per_week(cube2)
+    fig = px.line(df_aux, 'week_of_year', 'id')
+    return fig
+
+
+def deliveries_per_person_week(cube2, distinct2):
+    # Orders, distinct delivery people and deliveries per person per week of year
+    df_aux01 = orders_per_week(cube2)
+    df_aux02 = count_distinct_by(distinct2, 'week_of_year')
+    df_aux = pd.merge(df_aux01, df_aux02, how='inner')
+    df_aux['deliveries_per_person'] = df_aux['id'] / df_aux['delivery_person_id']
+    return df_aux
+
+
+@timed
+def delivery_person_by_week(cube2, distinct2):
+    # 2.1.5 Deliveries quantity by deliverer person per week (distinct2: select_sketch of utils/distinct.py)
+    df_aux = deliveries_per_person_week(cube2, distinct2)
+    fig = px.line(df_aux, x='week_of_year', y='deliveries_per_person')
+    return fig
+
+
+@timed
+def delivery_person_rolling(cube2, persons2):
+    # Deliveries per active delivery person over the last 7 and 28 days
+    df_aux = daily_orders(cube2, persons2)
+    fig = px.line(df_aux, x='order_date', y=['deliveries_per_person_7d', 'deliveries_per_person_28d'])
+    return fig
+
+
+def city_centers(df2):
+    # Median delivery location per city and traffic, like a groupby median,
+    # but one group at a time: only the rows of one group are copied and
+    # upcast, never the whole selection
+    city, traffic = df2['city'].array, df2['road_traffic_density'].array
+    code = city.codes.astype('int16') * len(traffic.categories) + traffic.codes
+    code[(city.codes < 0) | (traffic.codes < 0)] = -1
+    lat, lon = df2['delivery_location_latitude'].to_numpy(), df2['delivery_location_longitude'].to_numpy()
+
+    groups = np.unique(code)
+    groups = groups[groups >= 0]
+    medians = np.zeros((len(groups), 2))
+    for i, group in enumerate(groups):
+        rows = code == group
+        medians[i] = np.median(lat[rows].astype('float64')), np.median(lon[rows].astype('float64'))
+
+    return pd.DataFrame({'city': city.categories[groups // len(traffic.categories)],
+                         'road_traffic_density': traffic.categories[groups % len(traffic.categories)],
+                         'delivery_location_latitude': medians[:, 0], 'delivery_location_longitude': medians[:, 1]})
+
+
+def add_cells(map, cells, name, color):
+    # One circle per grid cell, sized by orders and labelled with count and mean time
+    import folium
+
+    layer = folium.FeatureGroup(name=name)
+    radius_scale = 12 / np.sqrt(cells['count'].max())
+    for cell in cells.itertuples(index=False):
+        folium.CircleMarker([cell.latitude, cell.longitude], radius=3 + radius_scale * np.sqrt(cell.count),
+                            color=color, fill=True, weight=1,
+                            tooltip='{} orders, {:.1f} min on average'.format(cell.count, cell.time_mean)).add_to(layer)
+    layer.add_to(map)
+
+
+@timed
+def country_map(df2):
+    # 2.1.6 Delivery and restaurant locations, binned server side on a grid
+    # so the map size stays bounded whatever the number of orders.
+    # Returns the folium map and the final cell size (None without orders).
+    # folium is imported here: only the map tab needs it, and it is slow to import
+    import folium
+    from folium.plugins import HeatMap
+
+    map = folium.Map(location=[22, 79], zoom_start=5)
+    if df2.empty:
+        return map, None
+
+    delivery_cells, cell_deg = grid_bins(df2['delivery_location_latitude'], df2['delivery_location_longitude'], df2['time_taken(min)'],
+                                         cell_deg=GRID_CELL_DEG, max_cells=MAX_MAP_CELLS)
+    restaurant_cells, _ = grid_bins(df2['restaurant_latitude'], df2['restaurant_longitude'], df2['time_taken(min)'],
+                                    cell_deg=GRID_CELL_DEG, max_cells=MAX_MAP_CELLS)
+
+    HeatMap(delivery_cells[['latitude', 'longitude', 'count']].to_numpy().tolist(), name='Delivery heatmap').add_to(map)
+    add_cells(map, delivery_cells, 'Delivery locations', 'blue')
+    add_cells(map, restaurant_cells, 'Restaurants', 'red')
+
+    # Central localization of each city by traffic
+    df_aux = city_centers(df2)
+    layer = folium.FeatureGroup(name='City center by traffic', show=False)
+    for i in df_aux.itertuples(index=False):
+        folium.Marker([i.delivery_location_latitude, i.delivery_location_longitude], popup='{} - {}'.format(i.city, i.road_traffic_density)).add_to(layer)
+    layer.add_to(map)
+
+    folium.LayerControl().add_to(map)
+    return map, cell_deg
+
+
+@timed
+def country_map_html(df2, height=600):
+    # The map rendered to the HTML folium_static would embed, so it can be
+    # cached and served to every session without rebuilding or re-rendering
+    import folium
+
+    map, cell_deg = country_map(df2)
+    return folium.Figure(height=height).add_child(map).render(), cell_deg
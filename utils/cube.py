@@ -0,0 +1,107 @@
+# Imports
+import numpy as np
+import pandas as pd
+
+from utils.timeseries import calendar_of
+
+# =========================
+# PRE-AGGREGATED CUBE
+# =========================
+# One row per (order_date, city, road_traffic_density, weatherconditions,
+# festival, type_of_order) cell holding mergeable partial aggregates: order
+# count, count/sum/sum of squares of each measure and min/max of the person
+# attributes. Any chart grouped by a subset of those dimensions is answered by
+# summing cells, so its cost depends on the number of cells, not on rows.
+# Distinct delivery people are not summable, so they are kept apart as the
+# set of (order_date, city, traffic, weather, delivery_person_id) pairs.
+
+DIMENSIONS = ['order_date', 'city', 'road_traffic_density', 'weatherconditions', 'festival', 'type_of_order']
+
+PERSON_DIMENSIONS = ['order_date', 'city', 'road_traffic_density', 'weatherconditions']
+
+# Cleaned column -> measure prefix in the cube
+MEASURES = {'time_taken(min)': 'time', 'delivery_person_ratings': 'rating', 'distance_km': 'distance'}
+
+# Cleaned column -> prefix of the min/max columns in the cube
+EXTREMES = {'delivery_person_age': 'age', 'vehicle_condition': 'vehicle'}
+
+CUBE_COLUMNS = DIMENSIONS + ['delivery_person_id'] + list(MEASURES) + list(EXTREMES)
+
+
+def build_cube(df1):
+    """
+    Returns (cube, persons) built from the cleaned dataset
+    """
+    parts = {dim: df1[dim] for dim in DIMENSIONS}
+    parts['count'] = np.ones(len(df1), dtype='int64')
+    agg = {'count': 'sum'}
+
+    for col, name in MEASURES.items():
+        # float64 so the squares of the downcast integer columns cannot overflow
+        values = df1[col].astype('float64')
+        valid = values.notna()
+        values = values.where(valid, 0)
+        parts[name + '_count'] = valid.astype('int64')
+        parts[name + '_sum'] = values
+        parts[name + '_sumsq'] = values * values
+        agg.update({name + '_count': 'sum', name + '_sum': 'sum', name + '_sumsq': 'sum'})
+
+    for col, name in EXTREMES.items():
+        parts[name + '_min'] = df1[col]
+        parts[name + '_max'] = df1[col]
+        agg.update({name + '_min': 'min', name + '_max': 'max'})
+
+    cube = pd.DataFrame(parts).groupby(DIMENSIONS, observed=True).agg(agg).reset_index()
+    persons = df1[PERSON_DIMENSIONS + ['delivery_person_id']].drop_duplicates().reset_index(drop=True)
+    return add_week_of_year(cube), add_week_of_year(persons)
+
+
+def add_week_of_year(frame):
+    """
+    Adds the week_of_year of order_date (strftime '%U', weeks start on
+    Sunday) as an int8 taken from the calendar dimension (utils/timeseries.py)
+    at build time, so the weekly charts only group by it
+    """
+    days, positions = calendar_of(frame)
+    frame['week_of_year'] = days['week_of_year'].to_numpy()[positions]
+    return frame
+
+
+def order_count(cube, by):
+    """
+    Number of orders per group of the `by` dimensions, in a 'count' column
+    """
+    return cube.groupby(by, observed=True)['count'].sum().reset_index()
+
+
+def rollup(cube, by, measure):
+    """
+    Mean and std (ddof=1, like pandas) of a measure ('time', 'rating' or
+    'distance') per group of the `by` dimensions, merged from the cell sums.
+    Columns: by..., <measure>_mean, <measure>_std
+    """
+    cols = [measure + '_count', measure + '_sum', measure + '_sumsq']
+    df_aux = cube.groupby(by, observed=True)[cols].sum()
+    n, s, ss = (df_aux[col].to_numpy(dtype='float64') for col in cols)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = s / n
+        var = np.clip(ss - s * mean, 0, None) / (n - 1)
+
+    df_aux[measure + '_mean'] = mean
+    df_aux[measure + '_std'] = np.where(n > 1, np.sqrt(var), np.nan)
+    return df_aux[[measure + '_mean', measure + '_std']].reset_index()
+
+
+def total_mean(cube, measure):
+    """
+    Mean of a measure over the whole (filtered) cube
+    """
+    return cube[measure + '_sum'].sum() / cube[measure + '_count'].sum()
+
+
+def extremes(cube, name):
+    """
+    (min, max) of a person attribute ('age' or 'vehicle') over the cube
+    """
+    return cube[name + '_min'].min(), cube[name + '_max'].max()
@@ -0,0 +1,334 @@
+# Imports
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils import cube, distinct, schema, sketch, snapshot, spatial, store
+from utils.geo import haversine_km
+from utils.metrics import timed
+from utils.timeseries import order_hours
+
+# =========================
+# DATA LAYER
+# =========================
+# Shared by every page: the dataset is read and cleaned once per version and
+# the cleaned frame is handed back from memory on every rerun. A version is
+# the file's path, mtime and size. An Arrow snapshot of the cleaned data
+# (utils/snapshot.py) is preferred when it is up to date. Cleaned frames use
+# the compact dtypes of utils/schema.py.
+#
+# Refresh: the frames, projections and cube of the published version live in
+# one dict per dataset. A background thread polls the files every
+# INDIA_DELIVERY_REFRESH_SECONDS and, when they changed, rebuilds everything
+# that was in use off the request path and swaps the new dict in with a single
+# assignment. Reruns keep reading the old version until then and never wait
+# on an ingest (0 disables the thread: changes are then picked up, and paid
+# for, by the next rerun).
+#
+# Copy-on-write: the cached frames are shared by every session and rerun, so
+# projections, filtered slices and anything derived from them must not copy
+# the data up front nor be able to write through to the cache. With pandas
+# copy-on-write both hold: a column projection or a date slice shares the
+# cached buffers and is copied only if someone modifies it.
+pd.set_option('mode.copy_on_write', True)
+
+# train.csv, or an incremental store directory (utils/store.py)
+DATA_PATH = os.environ.get('INDIA_DELIVERY_DATA', 'train.csv')
+
+NAN_COLUMNS = ['delivery_person_age', 'road_traffic_density', 'festival', 'city', 'multiple_deliveries']
+
+REFRESH_SECONDS = float(os.environ.get('INDIA_DELIVERY_REFRESH_SECONDS', '5'))
+
+_datasets = {}
+_lock = threading.RLock()
+_refresher = None
+
+logger = logging.getLogger(__name__)
+
+
+def _map_unique(col, func):
+    # Applies func to the distinct values of col only and broadcasts the result
+    # back to every row, text columns have few distinct values
+    codes, uniques = pd.factorize(col, use_na_sentinel=False)
+    values = np.asarray(func(pd.Series(uniques, dtype=col.dtype)))
+    return pd.Series(values[codes], index=col.index, name=col.name)
+
+
+def _strip(values):
+    if pd.api.types.infer_dtype(values, skipna=True) == 'string':
+        return values.str.strip()
+    return values.map(lambda x: x.strip() if isinstance(x, str) else x)
+
+
+def clean_data(df1):
+    """
+    Single pass cleaning: one validity mask for every 'NaN ' sentinel, bulk
+    parsing of the numeric and date columns and .str stripping of object columns
+    """
+
+    # Setting columns to lower
+    df1.columns = [i.lower() for i in df1.columns ]
+
+    # Removing N/A - delivery_person_age, road_traffic_density, festival, city and multiple_deliveries
+    lines = np.ones(len(df1), dtype=bool)
+    for col in NAN_COLUMNS:
+        lines &= (df1[col] != 'NaN ').to_numpy()
+    df1 = df1.take(np.flatnonzero(lines))
+
+    # Converting to int - delivery_person_age and multiple_deliveries
+    df1['delivery_person_age'] = df1['delivery_person_age'].astype('int64')
+    df1['multiple_deliveries'] = df1['multiple_deliveries'].astype('int64')
+
+    # Transforming time taken in int
+    df1['time_taken(min)'] = _map_unique(df1['time_taken(min)'], lambda x: x.str[-2:].astype('int64'))
+
+    # Converting to float - delivery_person_ratings ('NaN ' becomes NaN)
+    df1['delivery_person_ratings'] = df1['delivery_person_ratings'].astype(float)
+
+    # Converting to datetime - order_date
+    df1['order_date'] = _map_unique(df1['order_date'], lambda x: pd.to_datetime(x, format='%d-%m-%Y'))
+
+    # Removing spaces in object features
+    for col in df1.columns[df1.dtypes == object]:
+        df1[col] = _map_unique(df1[col], _strip)
+
+    return df1
+
+
+def file_key(path=DATA_PATH):
+    """
+    Cache key of a data file: (absolute path, mtime in ns, size in bytes)
+    """
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def add_derived_columns(df1):
+    """
+    Columns computed once at ingest so the pages never recompute them per rerun
+    """
+    # Restaurant to delivery location distance
+    df1['distance_km'] = haversine_km(df1['restaurant_latitude'], df1['restaurant_longitude'],
+                                      df1['delivery_location_latitude'], df1['delivery_location_longitude'])
+
+    # Hour of the order (-1 when unknown), time_orderd itself is not kept
+    df1['order_hour'] = _map_unique(df1['time_orderd'], order_hours)
+    return df1
+
+
+def read_clean_csv(path=DATA_PATH):
+    df_raw = pd.read_csv(path)
+    df1 = schema.compact(add_derived_columns(clean_data(df_raw)))
+
+    # Stored sorted by date, so date filters are binary searches (utils/filters.py)
+    return df1.sort_values('order_date', kind='stable')
+
+
+def _source(path, columns=None):
+    # An incremental store directory (keyed on its manifest), the Arrow
+    # snapshot when it is up to date, the CSV otherwise
+    if store.is_store(path):
+        return store.manifest_path(path), 'store'
+
+    snapshot_file = snapshot.snapshot_path(path)
+    if snapshot.is_fresh(snapshot_file, path, columns):
+        return snapshot_file, 'snapshot'
+    return path, 'csv'
+
+
+def _disk_version(path):
+    # Version of the data currently on disk
+    return file_key(_source(path)[0])
+
+
+def _label(path, version):
+    # Human readable version for the sidebar
+    if store.is_store(path):
+        return '{} v{}'.format(path, store.read_manifest(path)['version'])
+    modified = pd.Timestamp(version[1], unit='ns', tz='UTC').tz_convert(None)
+    return '{} {:%Y-%m-%d %H:%M:%S}'.format(os.path.basename(version[0]), modified)
+
+
+def _read(path, columns, values):
+    # Columns of the dataset (None: all of them) from its current source
+    source, kind = _source(path, columns)
+    if kind == 'store':
+        return store.read_store(os.path.dirname(source), columns)
+
+    if kind == 'snapshot':
+        return snapshot.read_snapshot(source, columns)
+
+    if columns is None:
+        return read_clean_csv(source)
+
+    # CSV: clean the whole file once, then project the requested columns
+    return _build(path, None, values)[list(columns)]
+
+
+def _build(path, tag, values):
+    # Value of tag ('cube', 'sketch', 'distinct', 'spatial' or a column
+    # selection) of a dataset version, built into its values dict on first use
+    if tag not in values:
+        if tag == 'cube':
+            if store.is_store(path):
+                # A store already holds the cube per partition
+                values[tag] = store.read_store_cube(path)
+            else:
+                values[tag] = cube.build_cube(_read(path, cube.CUBE_COLUMNS, values))
+        elif tag == 'sketch':
+            if store.is_store(path):
+                values[tag] = store.read_store_sketch(path)
+            else:
+                values[tag] = sketch.build_sketch(_read(path, sketch.SKETCH_COLUMNS, values))
+        elif tag == 'distinct':
+            # From the persons table, so stores merge their partitions first
+            values[tag] = distinct.build_sketch(_build(path, 'cube', values)[1])
+        elif tag == 'spatial':
+            values[tag] = spatial.build_spatial(_read(path, spatial.SPATIAL_COLUMNS, values))
+        else:
+            values[tag] = _read(path, tag, values)
+    return values[tag]
+
+
+def _dataset(path):
+    # Published version of the dataset at path: {'version', 'label', 'values'}
+    entry = _datasets.get(path)
+    if entry is not None and REFRESH_SECONDS > 0:
+        return entry
+
+    with _lock:
+        entry = _datasets.get(path)
+        if entry is None or (REFRESH_SECONDS <= 0 and entry['version'] != _disk_version(path)):
+            # First use (or no background refresh): built on the request path
+            version = _disk_version(path)
+            entry = {'version': version, 'label': _label(path, version), 'values': {}}
+            _datasets[path] = entry
+        _start_refresher()
+    return entry
+
+
+def _value(path, tag):
+    values = _dataset(path)['values']
+    value = values.get(tag)
+    if value is not None:
+        return value
+
+    with _lock:
+        return _build(path, tag, values)
+
+
+def refresh(path=DATA_PATH):
+    """
+    Rebuilds every frame and cube in use for the dataset at path when its
+    files changed, without blocking readers, then publishes the new version
+    in a single assignment. Returns True when a new version was swapped in.
+    """
+    entry = _datasets.get(path)
+    version = _disk_version(path)
+    if entry is None or entry['version'] == version:
+        return False
+
+    # Sessions keep reading the published entry while this builds
+    values = {}
+    for tag in list(entry['values']):
+        _build(path, tag, values)
+
+    with _lock:
+        _datasets[path] = {'version': version, 'label': _label(path, version), 'values': values}
+    return True
+
+
+def _refresh_loop():
+    # Polls every published dataset; a version is ingested once it has been
+    # seen unchanged for one interval, so a file being copied is not read
+    seen = {}
+    while True:
+        time.sleep(REFRESH_SECONDS)
+        for path in list(_datasets):
+            try:
+                version = _disk_version(path)
+                if version != _datasets[path]['version'] and seen.get(path) == version:
+                    refresh(path)
+                seen[path] = version
+            except Exception:
+                logger.exception('Refreshing %s failed, keeping the published version', path)
+
+
+def _start_refresher():
+    global _refresher
+    if REFRESH_SECONDS > 0 and _refresher is None:
+        _refresher = threading.Thread(target=_refresh_loop, name='india-delivery-refresher', daemon=True)
+        _refresher.start()
+
+
+def dataset_version(path=DATA_PATH):
+    """
+    Version of the published dataset at path (the cache key of the file it
+    was read from). Read it before load_data / load_cube so that a swap
+    during a rerun can only make the charts of that rerun newer than their key.
+    """
+    return _dataset(path)['version']
+
+
+def dataset_label(path=DATA_PATH):
+    """
+    Published dataset version as shown in the sidebar
+    """
+    return _dataset(path)['label']
+
+
+@timed
+def load_data(path=DATA_PATH, columns=None):
+    """
+    Returns the cleaned dataset, read and cleaned once per version of the
+    file. When an up to date Arrow snapshot of the file exists
+    (python -m utils.snapshot) it is memory-mapped instead and only the
+    requested columns are read. path can also be an incremental store
+    directory (python -m utils.store). A background thread ingests new
+    versions of the file and swaps them in, so only the very first load of
+    a process is built on the request path.
+    The returned frame is shared between sessions: never assign into it,
+    derive new frames instead (copy-on-write keeps those cheap).
+    """
+    columns = tuple(columns) if columns is not None else None
+    return _value(path, columns)
+
+
+@timed
+def load_cube(path=DATA_PATH):
+    """
+    Returns the (cube, persons) pre-aggregates of the dataset (utils/cube.py),
+    built once per version of the dataset
+    """
+    return _value(path, 'cube')
+
+
+@timed
+def load_sketch(path=DATA_PATH):
+    """
+    Returns the delivery time sketch of the dataset (utils/sketch.py), built
+    once per version of the dataset
+    """
+    return _value(path, 'sketch')
+
+
+@timed
+def load_distinct(path=DATA_PATH):
+    """
+    Returns the distinct deliverer sketches of the dataset (utils/distinct.py),
+    built once per version of the dataset
+    """
+    return _value(path, 'distinct')
+
+
+@timed
+def load_spatial(path=DATA_PATH):
+    """
+    Returns the spatial indexes of the dataset (utils/spatial.py), built once
+    per version of the dataset. Delivery positions are rows of load_data frames.
+    """
+    return _value(path, 'spatial')
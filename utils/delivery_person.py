@@ -0,0 +1,51 @@
+# Imports
+from utils.cube import rollup
+from utils.metrics import timed
+from utils.parallel import group_mean
+
+# =========================
+# DELIVERY PERSON VIEW
+# =========================
+# Tables of pages/2_delivery_person_view.py, importable by the benchmarks and scripts
+
+
+@timed
+def rating_per_person(df2):
+    # Average rating per delivery person
+    return group_mean(df2, ['delivery_person_id'], 'delivery_person_ratings').reset_index()
+
+
+@timed
+def rating_per_traffic(cube2):
+    # Average and std rating per traffic density, from the cube
+    return rollup(cube2, 'road_traffic_density', 'rating')
+
+
+@timed
+def rating_per_weather(cube2):
+    # Average and std rating per weather condition, from the cube
+    return rollup(cube2, 'weatherconditions', 'rating')
+
+
+@timed
+def top_deliverers(df2, k=10):
+    """
+    Fastest and slowest k delivery people per city by mean delivery time, from
+    a single groupby (utils/parallel.py). Ties are broken by delivery_person_id.
+    Returns (fastest, slowest), ordered like the old city / time sorts.
+    """
+    if df2.empty:
+        # No rows selected (e.g. a cleared multiselect): empty tables
+        empty = df2[['city', 'delivery_person_id', 'time_taken(min)']].astype({'time_taken(min)': 'float64'})
+        return empty.reset_index(drop=True), empty.reset_index(drop=True)
+
+    time_mean = group_mean(df2, ['city', 'delivery_person_id'], 'time_taken(min)')
+    by_city = time_mean.groupby(level='city', observed=True, group_keys=False)
+
+    # Partial selection per city; the index is sorted so keep='first' favours the lowest id
+    fastest = by_city.nsmallest(k, keep='first').reset_index()
+    slowest = by_city.nlargest(k, keep='first').reset_index()
+
+    fastest = fastest.sort_values(['city', 'time_taken(min)', 'delivery_person_id'], kind='stable')
+    slowest = slowest.sort_values(['city', 'time_taken(min)', 'delivery_person_id'], ascending=[False, False, True], kind='stable')
+    return fastest.reset_index(drop=True), slowest.reset_index(drop=True)
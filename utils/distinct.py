@@ -0,0 +1,151 @@
+# Imports
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.cube import PERSON_DIMENSIONS
+from utils.filters import apply_filters, select
+
+# =========================
+# DISTINCT DELIVERERS
+# =========================
+# Distinct counts cannot be summed from the cube cells, so the pages used to
+# run nunique over the filtered persons table. Instead, one HyperLogLog
+# sketch of the delivery_person_id values is kept per (order_date, city,
+# traffic, weather) cell: 2**p one-byte registers holding the maximum rank
+# (position of the first 1 bit) of the 64-bit hashes that fall in them. The
+# sketch of any selection of cells is their register-wise maximum, whatever
+# the selection, the order or the partition the cells came from, and its
+# cost depends on the number of cells, not on rows.
+#
+# Error bound: the relative standard error of a HyperLogLog estimate is
+# 1.04 / sqrt(2**p): 2.3% with the default p = 11 (INDIA_DELIVERY_HLL_PRECISION),
+# so about 95% of the counts are within 4.6% of the exact value. Small
+# counts use linear counting on the empty registers, which is more precise.
+#
+# INDIA_DELIVERY_DISTINCT picks the mode: 'exact' always runs nunique,
+# 'hll' always uses the sketches, and 'auto' (the default) runs nunique
+# while the selection holds at most INDIA_DELIVERY_DISTINCT_EXACT_ROWS
+# persons rows (200000 by default), where it is cheap.
+
+PRECISION = int(os.environ.get('INDIA_DELIVERY_HLL_PRECISION', '11'))
+MODE = os.environ.get('INDIA_DELIVERY_DISTINCT', 'auto')
+EXACT_MAX_ROWS = int(os.environ.get('INDIA_DELIVERY_DISTINCT_EXACT_ROWS', '200000'))
+
+PERSON = 'delivery_person_id'
+
+
+def _bit_length(values):
+    # Number of significant bits of each uint64
+    values = values.copy()
+    length = np.zeros(len(values), dtype='int64')
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= np.uint64(1 << shift)
+        length += shift * high
+        values = np.where(high, values >> np.uint64(shift), values)
+    return length + (values > 0)
+
+
+def hash_values(values):
+    """
+    64-bit hashes of the values of a categorical column, hashed once per category
+    """
+    categories = pd.util.hash_array(values.cat.categories.to_numpy(dtype=object))
+    return categories[values.cat.codes.to_numpy()]
+
+
+def registers_of(hashes, precision=PRECISION):
+    """
+    (register, rank) of each hash: its first `precision` bits choose the
+    register, the rank is the position of the first 1 bit of the rest
+    """
+    rest_bits = 64 - precision
+    register = (hashes >> np.uint64(rest_bits)).astype('int64')
+    rest = hashes & np.uint64((1 << rest_bits) - 1)
+    rank = rest_bits - _bit_length(rest) + 1
+    return register, rank.astype('uint8')
+
+
+def estimate(registers):
+    """
+    HyperLogLog estimate of the number of distinct values behind each row of
+    registers (a 1-D array is a single sketch)
+    """
+    registers = np.atleast_2d(registers)
+    m = registers.shape[1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.ldexp(1.0, -registers.astype('int64')).sum(axis=1)
+
+    # Linear counting while there are empty registers and the count is small
+    zeros = (registers == 0).sum(axis=1)
+    with np.errstate(divide='ignore'):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+def build_sketch(persons, precision=PRECISION):
+    """
+    HyperLogLog sketch per cell of the persons table (utils/cube.py):
+    {'cells': PERSON_DIMENSIONS, week_of_year and the number of persons rows
+    per cell, 'registers': uint8 array, one row of 2**precision per cell}
+    """
+    groups = persons.groupby(PERSON_DIMENSIONS, observed=True, sort=True)
+    cells = groups.agg(rows=(PERSON, 'size'), week_of_year=('week_of_year', 'first')).reset_index()
+
+    register, rank = registers_of(hash_values(persons[PERSON]), precision)
+    registers = np.zeros((len(cells), 1 << precision), dtype='uint8')
+    np.maximum.at(registers, (groups.ngroup().to_numpy(), register), rank)
+    return {'cells': cells, 'registers': registers}
+
+
+def select_sketch(sketch, persons, date_range, traffic_condition, weather_condition):
+    """
+    Sidebar selection of the sketch: {'persons': filtered persons table} when
+    the count is exact (see MODE), {'cells', 'registers'} of the selected
+    cells otherwise
+    """
+    positions = select(sketch['cells'], date_range, traffic_condition, weather_condition)
+    rows = sketch['cells']['rows'].to_numpy()[positions].sum()
+    if MODE == 'exact' or (MODE == 'auto' and rows <= EXACT_MAX_ROWS):
+        return {'persons': apply_filters(persons, date_range, traffic_condition, weather_condition)}
+
+    # Cells are sorted by date: a date range only is a view of the registers
+    if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+        rows = slice(positions[0], positions[-1] + 1)
+        return {'cells': sketch['cells'].iloc[rows], 'registers': sketch['registers'][rows]}
+    return {'cells': sketch['cells'].take(positions), 'registers': sketch['registers'][positions]}
+
+
+def count_distinct(sketch2):
+    """
+    Distinct delivery people of a selection (select_sketch)
+    """
+    if 'persons' in sketch2:
+        return sketch2['persons'][PERSON].nunique()
+    if not len(sketch2['registers']):
+        return 0
+    return int(round(estimate(sketch2['registers'].max(axis=0))[0]))
+
+
+def count_distinct_by(sketch2, key):
+    """
+    Distinct delivery people of a selection per value of a cell column
+    (e.g. week_of_year). Columns: key, delivery_person_id
+    """
+    if 'persons' in sketch2:
+        return sketch2['persons'].groupby(key, observed=True)[PERSON].nunique().reset_index()
+
+    keys = sketch2['cells'][key].to_numpy()
+    if not len(keys):
+        return pd.DataFrame({key: keys, PERSON: np.zeros(0, dtype='int64')})
+
+    # Cells sorted by key (already the case for weeks), each run of equal
+    # keys merged with a max over its rows (faster than reduceat on rows)
+    registers = sketch2['registers']
+    if (np.diff(keys) < 0).any():
+        order = np.argsort(keys, kind='stable')
+        keys, registers = keys[order], registers[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    merged = np.stack([registers[lo:hi].max(axis=0) for lo, hi in zip(starts, np.r_[starts[1:], len(keys)])])
+    return pd.DataFrame({key: keys[starts], PERSON: np.round(estimate(merged)).astype('int64')})
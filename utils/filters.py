@@ -0,0 +1,140 @@
+# Imports
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from utils.metrics import timed
+
+# =========================
+# FILTER ENGINE
+# =========================
+# Index over the sidebar filter columns of a frame (the cleaned dataset, the
+# cube or the persons table), built once per frame:
+# - the row positions sorted by order_date, so a date range is two binary
+#   searches and a contiguous slice;
+# - one packed bitmap per traffic and per weather value, in that sorted order.
+# A query ORs the bitmaps of the selected values over the date slice, ANDs the
+# columns together and returns the selected row positions, so the frame is
+# indexed only once per rerun.
+
+BITMAP_COLUMNS = ['road_traffic_density', 'weatherconditions']
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def build_index(frame):
+    """
+    Returns the filter index of a frame with order_date and BITMAP_COLUMNS
+    """
+    dates = frame['order_date'].to_numpy(dtype='datetime64[ns]').view('int64')
+    order = np.argsort(dates, kind='stable')
+    if (order == np.arange(len(order))).all():
+        # Already sorted by date (the data layer stores it that way)
+        order = None
+    else:
+        dates = dates[order]
+
+    bitmaps = {}
+    for col in BITMAP_COLUMNS:
+        # .array keeps categorical columns as codes instead of Python strings
+        values = frame[col].array
+        if order is not None:
+            values = values.take(order)
+        codes, uniques = pd.factorize(values)
+        bitmaps[col] = {value: np.packbits(codes == code) for code, value in enumerate(uniques)}
+
+    return {'dates': dates, 'order': order, 'bitmaps': bitmaps}
+
+
+def get_index(frame):
+    """
+    Filter index of a frame, built on first use and kept while the frame lives
+    """
+    key = id(frame)
+    entry = _indexes.get(key)
+    if entry is not None and entry[0]() is frame:
+        return entry[1]
+
+    with _lock:
+        index = build_index(frame)
+        ref = weakref.ref(frame, lambda _: _indexes.pop(key, None))
+        _indexes[key] = (ref, index)
+    return index
+
+
+def _date_bounds(dates, date_range):
+    # date_range is (start, end), both days included
+    start, end = (pd.Timestamp(d).normalize() for d in date_range)
+    end = end + pd.Timedelta(days=1)
+    return np.searchsorted(dates, [start.value, end.value], side='left')
+
+
+def select(frame, date_range, traffic_condition, weather_condition):
+    """
+    Row positions of frame with order_date in date_range and traffic / weather
+    in the selected values
+    """
+    index = get_index(frame)
+    lo, hi = _date_bounds(index['dates'], date_range)
+
+    # Byte range of the packed bitmaps that covers the date slice
+    first_byte, last_byte = lo // 8, (hi + 7) // 8
+    selected = None
+
+    for col, chosen in zip(BITMAP_COLUMNS, (traffic_condition, weather_condition)):
+        bitmaps = index['bitmaps'][col]
+        if set(bitmaps) <= set(chosen):
+            # Every value of the column is selected: nothing to filter
+            continue
+
+        column_bits = np.zeros(last_byte - first_byte, dtype='uint8')
+        for value in chosen:
+            if value in bitmaps:
+                column_bits |= bitmaps[value][first_byte:last_byte]
+        selected = column_bits if selected is None else selected & column_bits
+
+    if selected is None:
+        positions = np.arange(lo, hi)
+    else:
+        offset = first_byte * 8
+        bits = np.unpackbits(selected)[lo - offset:hi - offset]
+        positions = lo + np.flatnonzero(bits)
+
+    if index['order'] is not None:
+        positions = np.sort(index['order'][positions])
+    return positions
+
+
+def date_limits(frame):
+    """
+    First and last order_date day of frame as datetimes: the bounds and the
+    default value of the sidebar date range slider. The slider needs two
+    different days, so a single day of data ends one day later.
+    """
+    dates = get_index(frame)['dates']
+    if len(dates):
+        first, last = (pd.Timestamp(value).normalize() for value in dates[[0, -1]])
+    else:
+        first = last = pd.Timestamp.today().normalize()
+    last = max(last, first + pd.Timedelta(days=1))
+    return first.to_pydatetime(), last.to_pydatetime()
+
+
+@timed
+def apply_filters(frame, date_range, traffic_condition, weather_condition):
+    """
+    Sidebar filters of the pages. Returns the frame itself when nothing is
+    filtered out, a view of it when the selection is one run of rows (a date
+    range only, the frame being sorted by date), a single take otherwise.
+    """
+    positions = select(frame, date_range, traffic_condition, weather_condition)
+    if len(positions) == len(frame):
+        return frame
+
+    # positions are sorted: they are contiguous when first to last spans exactly len(positions)
+    if len(positions) and positions[-1] - positions[0] + 1 == len(positions):
+        return frame.iloc[positions[0]:positions[-1] + 1]
+    return frame.take(positions)
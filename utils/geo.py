@@ -0,0 +1,76 @@
+# Imports
+import numpy as np
+import pandas as pd
+
+# =========================
+# GEO KERNELS
+# =========================
+
+# Same mean earth radius as the haversine package
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in km between two sets of points given in degrees.
+    Works on scalars or whole arrays/Series at once and matches
+    haversine((lat1, lon1), (lat2, lon2)) within floating point tolerance.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype='float64')) for x in (lat1, lon1, lat2, lon2))
+    d = (np.sin((lat2 - lat1) * 0.5) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(d))
+
+
+# Points binned per chunk: only one chunk is ever upcast to float64
+GRID_CHUNK_ROWS = 1 << 16
+
+
+def _cell_keys(lat, lon, cell_deg):
+    # One int64 key per point, ordered like (row, col)
+    key = np.floor(lat.astype('float64') / cell_deg).astype('int64') << 32
+    key += np.floor(lon.astype('float64') / cell_deg).astype('int64') + 2**31
+    return key
+
+
+def grid_bins(lat, lon, time, cell_deg=0.01, max_cells=500):
+    """
+    Aggregates points into a lat/lon grid of cell_deg degrees: one row per
+    non-empty cell with the mean position of its points, the number of
+    points and their mean delivery time. The cell size doubles (merging
+    the partial sums of the finer cells) until at most max_cells remain,
+    so the output size does not depend on the number of points.
+    Returns (cells, cell_deg).
+    """
+    # Two passes over chunks of points: the first collects the sorted
+    # non-empty cell keys, the second adds each chunk into per-key sums
+    # with bincount. Besides the sums only one chunk is held at a time,
+    # so the float32 coordinates are never copied or upcast whole
+    lat, lon, time = (np.asarray(values) for values in (lat, lon, time))
+    chunks = [slice(lo, lo + GRID_CHUNK_ROWS) for lo in range(0, len(lat), GRID_CHUNK_ROWS)]
+    keys = np.zeros(0, dtype='int64')
+    for chunk in chunks:
+        keys = np.union1d(keys, _cell_keys(lat[chunk], lon[chunk], cell_deg))
+
+    n = len(keys)
+    sums = {name: np.zeros(n) for name in ('count', 'time_sum', 'lat_sum', 'lon_sum')}
+    for chunk in chunks:
+        codes = np.searchsorted(keys, _cell_keys(lat[chunk], lon[chunk], cell_deg))
+        sums['count'] += np.bincount(codes, minlength=n)
+        for name, values in (('time_sum', time), ('lat_sum', lat), ('lon_sum', lon)):
+            sums[name] += np.bincount(codes, weights=values[chunk].astype('float64'), minlength=n)
+    sums['count'] = sums['count'].astype('int64')
+    cells = pd.DataFrame(sums)
+    cells.index = pd.MultiIndex.from_arrays([keys >> 32, (keys & 0xFFFFFFFF) - 2**31], names=['row', 'col'])
+
+    while len(cells) > max_cells:
+        cell_deg *= 2
+        rows = cells.index.get_level_values('row') // 2
+        cols = cells.index.get_level_values('col') // 2
+        cells = cells.groupby([rows, cols]).sum()
+
+    cells = pd.DataFrame({'latitude': cells['lat_sum'] / cells['count'],
+                          'longitude': cells['lon_sum'] / cells['count'],
+                          'count': cells['count'],
+                          'time_mean': cells['time_sum'] / cells['count']}).reset_index(drop=True)
+    return cells, cell_deg
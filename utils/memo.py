@@ -0,0 +1,106 @@
+# Imports
+import collections
+import functools
+import os
+import sys
+import threading
+
+import pandas as pd
+
+# =========================
+# CHART CACHE
+# =========================
+# Process-wide LRU cache of the aggregates and figures of the pages, shared
+# by every session. A chart is keyed on the dataset version, the normalized
+# sidebar state (first / last day, sorted traffic and weather selections, so
+# equivalent states share entries) and the chart name, so a rerun that does
+# not change what a chart depends on is served from memory. Entries are
+# mostly small (aggregated tables and Plotly figures) but rendered maps are
+# a few hundred KB, so both the number of entries
+# (INDIA_DELIVERY_CHART_CACHE) and their approximate size
+# (INDIA_DELIVERY_CHART_CACHE_MB) are bounded, least recently used evicted
+# first. Cached values are shared between sessions: never modify them in place.
+
+MAX_ENTRIES = int(os.environ.get('INDIA_DELIVERY_CHART_CACHE', '512'))
+MAX_BYTES = int(os.environ.get('INDIA_DELIVERY_CHART_CACHE_MB', '256')) * 2**20
+
+_entries = collections.OrderedDict()
+_sizes = {}
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes': 0}
+_lock = threading.Lock()
+
+
+def filter_state(date_range, traffic_condition, weather_condition):
+    """
+    Normalized sidebar filters: (first day, last day, traffic values, weather values)
+    """
+    start, end = (pd.Timestamp(d).normalize().date().isoformat() for d in date_range)
+    return start, end, tuple(sorted(set(traffic_condition))), tuple(sorted(set(weather_condition)))
+
+
+def _size(value):
+    # Approximate size in bytes: exact for text and frames, JSON size for
+    # figures, summed over containers, shallow otherwise
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, (tuple, list)):
+        return sum(_size(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_size(k) + _size(v) for k, v in value.items())
+    if hasattr(value, 'to_plotly_json'):
+        # Plotly figure: the length of its JSON, which is what st.plotly_chart sends
+        return len(value.to_json())
+    return sys.getsizeof(value)
+
+
+def cached(key, build):
+    """
+    Value of key, calling build() on a miss. Concurrent misses of the same key
+    may both build it; the last one wins, which is harmless for pure charts.
+    """
+    with _lock:
+        if key in _entries:
+            _entries.move_to_end(key)
+            _stats['hits'] += 1
+            return _entries[key]
+        _stats['misses'] += 1
+
+    value = build()
+    size = _size(value)
+
+    with _lock:
+        _stats['bytes'] += size - _sizes.get(key, 0)
+        _entries[key], _sizes[key] = value, size
+        _entries.move_to_end(key)
+        while len(_entries) > 1 and (len(_entries) > MAX_ENTRIES or _stats['bytes'] > MAX_BYTES):
+            old_key, _ = _entries.popitem(last=False)
+            _stats['bytes'] -= _sizes.pop(old_key)
+            _stats['evictions'] += 1
+    return value
+
+
+def lazy(func, *args):
+    """
+    Zero-argument function returning func(*args), computed on its first call
+    only: the filtered frames of a rerun are built only if a chart misses
+    """
+    return functools.cache(functools.partial(func, *args))
+
+
+def stats():
+    """
+    Counters of the cache: hits, misses, evictions, bytes, entries and max_entries
+    """
+    with _lock:
+        return dict(_stats, entries=len(_entries), max_entries=MAX_ENTRIES)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+        _sizes.clear()
+        _stats['bytes'] = 0
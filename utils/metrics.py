@@ -0,0 +1,234 @@
+# Imports
+import collections
+import contextlib
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from utils import memo
+
+# =========================
+# HOT PATH METRICS
+# =========================
+# Each page rerun is a run: start_run() at the top of the page, finish_run()
+# at the end. In between, every stage (ingest, filters, each chart, the map
+# render) records its wall time, rows in / out and the process RSS delta.
+# Functions are instrumented with @timed, blocks with `with stage(...)`;
+# outside of a run both are a plain call. Finished runs are kept in memory
+# for the p50/p95 figures of the debug panel (?debug=1 or
+# INDIA_DELIVERY_DEBUG=1) and, when INDIA_DELIVERY_METRICS names a folder,
+# appended to runs.jsonl. The summary in metrics.prom (Prometheus text) is
+# rewritten by a background thread every INDIA_DELIVERY_METRICS_SECONDS,
+# so a rerun only pays for its jsonl line.
+
+HISTORY = 1000
+QUANTILES = [0.5, 0.95, 0.99]
+METRICS_DIR = os.environ.get('INDIA_DELIVERY_METRICS')
+EXPORT_SECONDS = float(os.environ.get('INDIA_DELIVERY_METRICS_SECONDS', '15'))
+
+_local = threading.local()
+_history = collections.deque(maxlen=HISTORY)
+_lock = threading.Lock()
+_exporter = None
+
+logger = logging.getLogger(__name__)
+
+
+def _rss_bytes():
+    # Resident memory of the process (Linux); None elsewhere
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def _rows(value):
+    # Row count of a frame / array argument or result, None for figures and scalars
+    shape = getattr(value, 'shape', None)
+    return int(shape[0]) if shape else None
+
+
+def start_run(page):
+    _local.run = {'page': page, 'start': time.time(), 'stages': []}
+    _local.clock = time.perf_counter()
+
+
+@contextlib.contextmanager
+def stage(name, rows_in=None):
+    """
+    Records a block as one stage of the current run:
+
+        with stage('map_iframe'):
+            st.iframe(html, width=1024, height=610)
+
+    rows_out can be set on the yielded record.
+    """
+    record = {'stage': name, 'rows_in': rows_in, 'rows_out': None}
+    rss = _rss_bytes()
+    clock = time.perf_counter()
+    try:
+        yield record
+    finally:
+        run = getattr(_local, 'run', None)
+        if run is not None:
+            record['seconds'] = time.perf_counter() - clock
+            rss_after = _rss_bytes()
+            record['rss_delta_mb'] = None if rss is None or rss_after is None else round((rss_after - rss) / 2**20, 2)
+            run['stages'].append(record)
+
+
+def timed(func=None, name=None):
+    """
+    Decorator recording each call of func as a stage of the current run
+    """
+    if func is None:
+        return functools.partial(timed, name=name)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_local, 'run', None) is None:
+            return func(*args, **kwargs)
+        with stage(name or func.__name__, _rows(args[0]) if args else None) as record:
+            result = func(*args, **kwargs)
+            record['rows_out'] = _rows(result[0] if isinstance(result, tuple) else result)
+        return result
+
+    return wrapper
+
+
+def finish_run():
+    """
+    Closes the current run, stores it in the history and exports it
+    """
+    run = getattr(_local, 'run', None)
+    if run is None:
+        return None
+    run['seconds'] = time.perf_counter() - _local.clock
+    _local.run = None
+
+    with _lock:
+        _history.append(run)
+        if METRICS_DIR:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            with open(os.path.join(METRICS_DIR, 'runs.jsonl'), 'a') as f:
+                f.write(json.dumps(run) + '\n')
+            _start_exporter()
+    return run
+
+
+def write_prometheus(directory):
+    # metrics.prom replaced in one rename, so a scraper never reads half a file
+    tmp_path = os.path.join(directory, 'metrics.prom.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, os.path.join(directory, 'metrics.prom'))
+
+
+def _export_loop():
+    # Rewrites metrics.prom when runs finished since the last write
+    written = None
+    while True:
+        time.sleep(EXPORT_SECONDS)
+        last = _history[-1] if _history else None
+        if last is not written:
+            try:
+                write_prometheus(METRICS_DIR)
+                written = last
+            except OSError:
+                logger.exception('Writing metrics.prom to %s failed', METRICS_DIR)
+
+
+def _start_exporter():
+    global _exporter
+    if _exporter is None:
+        _exporter = threading.Thread(target=_export_loop, name='india-delivery-metrics', daemon=True)
+        _exporter.start()
+
+
+def runs(page=None):
+    return [run for run in list(_history) if page is None or run['page'] == page]
+
+
+def quantiles(values):
+    return dict(zip(QUANTILES, np.quantile(values, QUANTILES))) if len(values) else {}
+
+
+def _summary(lines, metric, labels, values):
+    for q, value in quantiles(values).items():
+        lines.append('{}{{{},quantile="{}"}} {:.6f}'.format(metric, labels, q, value))
+    lines.append('{}_sum{{{}}} {:.6f}'.format(metric, labels, sum(values)))
+    lines.append('{}_count{{{}}} {}'.format(metric, labels, len(values)))
+
+
+def prometheus_text():
+    """
+    Rerun and stage latencies of the history in Prometheus text format
+    """
+    history = runs()
+    lines = ['# HELP india_delivery_rerun_seconds Wall time of a page rerun',
+             '# TYPE india_delivery_rerun_seconds summary']
+    for page in sorted({run['page'] for run in history}):
+        _summary(lines, 'india_delivery_rerun_seconds', 'page="{}"'.format(page),
+                 [run['seconds'] for run in history if run['page'] == page])
+
+    lines += ['# HELP india_delivery_stage_seconds Wall time of a stage within a page rerun',
+              '# TYPE india_delivery_stage_seconds summary']
+    stages = collections.defaultdict(list)
+    for run in history:
+        for record in run['stages']:
+            stages[(run['page'], record['stage'])].append(record['seconds'])
+    for (page, name), values in sorted(stages.items()):
+        _summary(lines, 'india_delivery_stage_seconds', 'page="{}",stage="{}"'.format(page, name), values)
+
+    # Chart cache counters (utils/memo.py)
+    cache = memo.stats()
+    for name in ('hits', 'misses', 'evictions'):
+        lines += ['# TYPE india_delivery_chart_cache_{}_total counter'.format(name),
+                  'india_delivery_chart_cache_{}_total {}'.format(name, cache[name])]
+    lines += ['# TYPE india_delivery_chart_cache_entries gauge',
+              'india_delivery_chart_cache_entries {}'.format(cache['entries']),
+              '# TYPE india_delivery_chart_cache_bytes gauge',
+              'india_delivery_chart_cache_bytes {}'.format(cache['bytes'])]
+    return '\n'.join(lines) + '\n'
+
+
+def jsonl_text():
+    return ''.join(json.dumps(run) + '\n' for run in runs())
+
+
+def debug_enabled():
+    import streamlit as st
+    return os.environ.get('INDIA_DELIVERY_DEBUG') == '1' or st.query_params.get('debug') == '1'
+
+
+def debug_panel(run):
+    """
+    Sidebar panel with the stages of the last run and the rerun percentiles
+    """
+    import pandas as pd
+    import streamlit as st
+
+    if run is None or not debug_enabled():
+        return
+
+    with st.sidebar.expander('Debug: timings', expanded=True):
+        st.markdown('Last rerun: **{:.1f} ms**'.format(run['seconds'] * 1000))
+        df_aux = pd.DataFrame(run['stages'])
+        if not df_aux.empty:
+            df_aux['ms'] = (df_aux.pop('seconds') * 1000).round(2)
+            st.dataframe(df_aux, hide_index=True)
+
+        latencies = quantiles([r['seconds'] for r in runs(run['page'])])
+        st.markdown(' / '.join('p{:g}: {:.1f} ms'.format(q * 100, v * 1000) for q, v in latencies.items()))
+        cache = memo.stats()
+        st.markdown('Chart cache: {} hits / {} misses, {} of {} entries, {:.1f} MB'.format(
+            cache['hits'], cache['misses'], cache['entries'], cache['max_entries'], cache['bytes'] / 2**20))
+        # Exports built on click only, so they do not weigh on the timings above
+        st.download_button('Runs (JSON lines)', jsonl_text, file_name='runs.jsonl')
+        st.download_button('Metrics (Prometheus)', prometheus_text, file_name='metrics.prom')
@@ -0,0 +1,168 @@
+# Imports
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# =========================
+# PARALLEL AGGREGATION
+# =========================
+# Row level groupbys of the pages (mean delivery time per city and person,
+# mean rating per person) spread over a process pool. The key codes of the
+# categorical group columns and the measured values are copied once into
+# shared memory; each worker reads one contiguous range of rows (the data
+# is sorted by date, so a range is a date range) and returns, per group,
+# the count of values and their sum. The parent adds the partials up, which
+# is exact for counts and integer measures, and rebuilds the frame pandas
+# would return.
+# INDIA_DELIVERY_WORKERS sets the number of worker processes ('auto' for one
+# per core). With 1 (the default), non-categorical keys, fewer rows than
+# INDIA_DELIVERY_PARALLEL_MIN_ROWS or no forkserver start method (Windows) the
+# plain pandas groupby runs instead.
+
+_workers = os.environ.get('INDIA_DELIVERY_WORKERS', '1')
+WORKERS = (os.cpu_count() or 1) if _workers == 'auto' else int(_workers)
+MIN_ROWS = int(os.environ.get('INDIA_DELIVERY_PARALLEL_MIN_ROWS', '200000'))
+
+_pool = None
+_lock = threading.Lock()
+
+
+def _executor():
+    # One pool per process, started on first use. Workers come from a fork
+    # server, a small single threaded process: forking the Streamlit server
+    # itself would copy locks held by its other threads (logging, the data
+    # refresher, the import lock) into children that could never release
+    # them. Under streamlit run __main__ is Streamlit's guarded CLI entry
+    # point, so the fork server does not re-run any page. Workers only run
+    # numpy on the shared blocks.
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = concurrent.futures.ProcessPoolExecutor(max_workers=WORKERS,
+                                                           mp_context=multiprocessing.get_context('forkserver'))
+        return _pool
+
+
+def _share(array):
+    # Copies an array into a new shared memory block: (block, descriptor)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _attach(descriptor):
+    name, shape, dtype = descriptor
+    # Workers share the parent's resource tracker, which unlinks the block
+    # only when the parent does
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _combined_key(codes, radices):
+    # One int64 per row, ordered like the tuple of codes
+    key = np.zeros(len(codes[0]), dtype='int64')
+    for col_codes, radix in zip(codes, radices):
+        key = key * radix + col_codes
+    return key
+
+
+def _sums(key, values):
+    # Per distinct key (sorted): count of non-NaN values and their sum, per value array
+    keys, inverse = np.unique(key, return_inverse=True)
+    counts, sums = [], []
+    for col_values in values:
+        valid = ~np.isnan(col_values)
+        counts.append(np.bincount(inverse, weights=valid, minlength=len(keys)))
+        sums.append(np.bincount(inverse, weights=np.where(valid, col_values, 0.0), minlength=len(keys)))
+    return keys, counts, sums
+
+
+def _partial(code_descriptors, value_descriptors, radices, lo, hi):
+    # Worker task: partial counts and sums of rows lo:hi
+    attached = [_attach(d) for d in code_descriptors + value_descriptors]
+    try:
+        arrays = [array[lo:hi] for _, array in attached]
+        codes, values = arrays[:len(code_descriptors)], arrays[len(code_descriptors):]
+
+        # Rows with a missing key are left out, like groupby(dropna=True)
+        present = np.logical_and.reduce([c >= 0 for c in codes])
+        codes = [c[present].astype('int64') for c in codes]
+        values = [v[present] for v in values]
+        return _sums(_combined_key(codes, radices), values)
+    finally:
+        for block, _ in attached:
+            block.close()
+
+
+def enabled(frame, by):
+    """
+    True when a groupby of frame on `by` runs in the worker pool
+    """
+    return (WORKERS > 1 and len(frame) >= MIN_ROWS and 'forkserver' in multiprocessing.get_all_start_methods()
+            and all(isinstance(frame[col].dtype, pd.CategoricalDtype) for col in by))
+
+
+def group_sums(frame, by, columns):
+    """
+    Count of non-NaN values and sum of each of `columns` per group of the
+    categorical `by` columns, computed in the worker pool: a frame indexed
+    like frame.groupby(by, observed=True), with <col>_count and <col>_sum
+    """
+    categories = [frame[col].cat.categories for col in by]
+    radices = [len(c) for c in categories]
+    blocks, code_descriptors, value_descriptors = [], [], []
+    try:
+        for col in by:
+            block, descriptor = _share(frame[col].cat.codes.to_numpy())
+            blocks.append(block)
+            code_descriptors.append(descriptor)
+        for col in columns:
+            block, descriptor = _share(frame[col].to_numpy(dtype='float64', na_value=np.nan))
+            blocks.append(block)
+            value_descriptors.append(descriptor)
+
+        bounds = np.linspace(0, len(frame), WORKERS + 1).astype('int64')
+        futures = [_executor().submit(_partial, code_descriptors, value_descriptors, radices, lo, hi)
+                   for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+        partials = [future.result() for future in futures]
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    # Merge: the same key in several ranges (a day, a person) is added up
+    keys = np.concatenate([p[0] for p in partials])
+    merged_keys, inverse = np.unique(keys, return_inverse=True)
+    df_aux = {}
+    for i, col in enumerate(columns):
+        df_aux[col + '_count'] = np.bincount(inverse, weights=np.concatenate([p[1][i] for p in partials]),
+                                             minlength=len(merged_keys)).astype('int64')
+        df_aux[col + '_sum'] = np.bincount(inverse, weights=np.concatenate([p[2][i] for p in partials]),
+                                           minlength=len(merged_keys))
+
+    # Back from the combined key to the codes of each column
+    levels, rest = [], merged_keys
+    for col, radix in reversed(list(zip(by, radices))):
+        levels.insert(0, pd.Categorical.from_codes(rest % radix, dtype=frame[col].dtype))
+        rest = rest // radix
+    index = pd.MultiIndex.from_arrays(levels, names=by) if len(by) > 1 else pd.CategoricalIndex(levels[0], name=by[0])
+    return pd.DataFrame(df_aux, index=index)
+
+
+def group_mean(frame, by, column):
+    """
+    frame.groupby(by, observed=True)[column].mean(), in the worker pool when
+    enabled(frame, by) and with pandas otherwise
+    """
+    if not enabled(frame, by):
+        return frame.groupby(by, observed=True)[column].mean()
+
+    df_aux = group_sums(frame, by, [column])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = df_aux[column + '_sum'] / df_aux[column + '_count']
+    return mean.rename(column)
@@ -0,0 +1,355 @@
+# Imports
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils import snapshot
+from utils.business import (delivery_person_by_week, delivery_person_rolling, deliveries_per_person_week,
+                            order_by_week, order_distribution_traffic, order_metric, orders_per_week,
+                            traffic_distribution, traffic_order_city)
+from utils.cube import extremes, order_count, rollup
+from utils.data import DATA_PATH, dataset_label, dataset_version, load_cube, load_data, load_distinct, load_sketch, load_spatial
+from utils.delivery_person import rating_per_person, rating_per_traffic, rating_per_weather, top_deliverers
+from utils.distinct import count_distinct, select_sketch
+from utils.filters import apply_filters, select
+from utils.memo import filter_state
+from utils.restaurant import (avg_delivery_by_city, avg_delivery_city, avg_delivery_order_type, avg_deviation_by_city,
+                              delivery_time_by_distance, delivery_time_percentiles, distance, distance_band_chart,
+                              nearest_restaurants, percentiles_by_city_traffic, percentiles_by_festival_order_type)
+from utils.sketch import quantiles
+from utils.timeseries import daily_orders
+
+# =========================
+# BATCH PRECOMPUTE
+# =========================
+# Runs the cleaning pipeline and the aggregates of every page once, outside
+# Streamlit, for a grid of filter presets (date ranges x traffic x weather),
+# and writes them as static artifacts: tables as Parquet (or JSON records),
+# the metrics of each preset as JSON and every page chart as Plotly figure
+# JSON (plotly.io.from_json reads it back). The country map is not
+# exported: it is folium HTML built from the rows of the selection.
+#
+# Layout: one directory per dataset version and ARTIFACT_VERSION under the
+# output directory, with a manifest.json listing the presets (their filters
+# and the filter_state key the pages cache charts under, utils/memo.py) and
+# their files, and latest.json pointing at the last complete version. A
+# version is written under a temporary name and renamed once complete, and
+# is not recomputed while it exists (--force does).
+#
+# Usage: python -m utils.precompute [--csv train.csv] [--output artifacts] [--format parquet]
+#                                   [--traffic each] [--weather all]
+
+OUTPUT_PATH = 'artifacts'
+MANIFEST = 'manifest.json'
+LATEST = 'latest.json'
+
+# Bumped when the artifacts change, so old and new never share a directory
+ARTIFACT_VERSION = 2
+
+# Sidebar choices of the pages
+TRAFFIC_CONDITION = ['Jam', 'High', 'Low', 'Medium']
+WEATHER_CONDITION = ['conditions Sunny', 'conditions Stormy', 'conditions Sandstorms',
+                     'conditions Cloudy', 'conditions Fog', 'conditions Windy']
+
+# Rolling date ranges ending on the last day of the data, in days
+LAST_DAYS = (7, 28)
+
+# Row level columns of all pages
+COLUMNS = ['order_date', 'city', 'road_traffic_density', 'weatherconditions', 'delivery_person_id',
+           'delivery_person_ratings', 'time_taken(min)', 'distance_km', 'delivery_location_latitude',
+           'delivery_location_longitude']
+
+TOP_K = 10
+
+
+def _slug(value):
+    return value.replace('conditions ', '').strip().lower().replace(' ', '-')
+
+
+def date_presets(cube):
+    """
+    Named date ranges (first and last day included) of the data: all of it,
+    the last 7 and 28 days and every calendar month
+    """
+    if cube.empty:
+        return {}
+    first, last = cube['order_date'].min().normalize(), cube['order_date'].max().normalize()
+    ranges = {'all': (first, last)}
+    for days in LAST_DAYS:
+        ranges['last-{}d'.format(days)] = (max(first, last - pd.Timedelta(days=days - 1)), last)
+    for month in pd.period_range(first, last, freq='M'):
+        ranges[str(month)] = (max(first, month.start_time), min(last, month.end_time.normalize()))
+    return ranges
+
+
+def _choices(values, mode):
+    # 'all' selects every value at once, 'each' adds one preset per value
+    choices = {'all': list(values)}
+    if mode == 'each':
+        choices.update((_slug(value), [value]) for value in values)
+    return choices
+
+
+def presets(cube, traffic='each', weather='all'):
+    """
+    Grid of filter presets: every date preset with every traffic and weather
+    choice. traffic / weather: 'all' (every value selected) or 'each' (also
+    one preset per value).
+    """
+    grid = itertools.product(date_presets(cube).items(), _choices(TRAFFIC_CONDITION, traffic).items(),
+                             _choices(WEATHER_CONDITION, weather).items())
+    return [{'id': '{}_traffic-{}_weather-{}'.format(date_name, traffic_name, weather_name),
+             'date_range': date_range, 'traffic': traffic_values, 'weather': weather_values}
+            for (date_name, date_range), (traffic_name, traffic_values), (weather_name, weather_values) in grid]
+
+
+def _number(value):
+    # JSON friendly scalar, None for missing values
+    value = np.asarray(value).ravel()
+    if not len(value) or pd.isna(value[0]):
+        return None
+    return value[0].item()
+
+
+def festival_delta(cube2):
+    """
+    Mean and std delivery time with and without festival, and the difference
+    of the means (festival minus no festival)
+    """
+    df_aux = rollup(cube2, 'festival', 'time')
+    means = df_aux.set_index('festival')['time_mean']
+    df_aux['delta_vs_no_festival'] = df_aux['time_mean'] - means.get('No', np.nan)
+    return df_aux
+
+
+def aggregates(data, preset):
+    """
+    Tables, metrics and figures of the pages for one filter preset. data:
+    the loaded dataset (df1, cube, persons, sketch, distinct, spatial).
+    """
+    filters = (preset['date_range'], preset['traffic'], preset['weather'])
+    df1 = data['df1']
+    df2 = apply_filters(df1, *filters)
+    cube2 = apply_filters(data['cube'], *filters)
+    persons2 = apply_filters(data['persons'], *filters)
+    sketch2 = apply_filters(data['sketch'], *filters)
+    distinct2 = select_sketch(data['distinct'], data['persons'], *filters)
+
+    fastest, slowest = top_deliverers(df2, TOP_K)
+    distance_bands = delivery_time_by_distance(df2)
+    festival = festival_delta(cube2)
+    tables = {
+        # Business view
+        'orders_per_day': daily_orders(cube2, persons2),
+        'orders_per_week': orders_per_week(cube2),
+        'traffic_distribution': traffic_distribution(cube2),
+        'orders_by_city_traffic': order_count(cube2, ['city', 'road_traffic_density']),
+        'deliveries_per_person_week': deliveries_per_person_week(cube2, distinct2),
+        # Delivery person view
+        'rating_per_person': rating_per_person(df2),
+        'rating_per_traffic': rating_per_traffic(cube2),
+        'rating_per_weather': rating_per_weather(cube2),
+        'fastest_deliverers': fastest,
+        'slowest_deliverers': slowest,
+        # Restaurant view
+        'delivery_time_by_city': rollup(cube2, 'city', 'time'),
+        'delivery_time_by_order_type': avg_delivery_order_type(cube2),
+        'delivery_time_by_city_traffic': rollup(cube2, ['city', 'road_traffic_density'], 'time'),
+        'distance_by_city': rollup(cube2, 'city', 'distance'),
+        'festival_delta': festival,
+        'percentiles_by_city_traffic': quantiles(sketch2, ['city', 'road_traffic_density']),
+        'percentiles_by_festival_order_type': percentiles_by_festival_order_type(sketch2),
+        'delivery_time_by_distance': distance_bands,
+        'nearest_restaurants': nearest_restaurants(data['spatial'], df2, select(df1, *filters)),
+    }
+
+    age_min, age_max = extremes(cube2, 'age')
+    vehicle_min, vehicle_max = extremes(cube2, 'vehicle')
+    deltas = festival.set_index('festival')['delta_vs_no_festival']
+    metrics = {'orders': int(cube2['count'].sum()), 'deliverers': int(count_distinct(distinct2)),
+               'age_min': _number(age_min), 'age_max': _number(age_max),
+               'vehicle_condition_min': _number(vehicle_min), 'vehicle_condition_max': _number(vehicle_max),
+               'distance_mean_km': _number(distance(cube2)),
+               'festival_delta_min': _number(np.round(deltas.get('Yes', np.nan), 2))}
+    metrics.update((name, _number(value)) for name, value in delivery_time_percentiles(sketch2).items())
+
+    figures = {
+        'order_metric': order_metric(cube2),
+        'order_distribution_traffic': order_distribution_traffic(cube2),
+        'traffic_order_city': traffic_order_city(cube2),
+        'order_by_week': order_by_week(cube2),
+        'delivery_person_by_week': delivery_person_by_week(cube2, distinct2),
+        'delivery_person_rolling': delivery_person_rolling(cube2, persons2),
+        'avg_delivery_city': avg_delivery_city(cube2),
+        'avg_delivery_by_city': avg_delivery_by_city(cube2),
+        'avg_deviation_by_city': avg_deviation_by_city(cube2),
+        'percentiles_by_city_traffic': percentiles_by_city_traffic(sketch2),
+        'distance_band_chart': distance_band_chart(distance_bands),
+    }
+    return tables, metrics, figures
+
+
+def write_table(df_aux, path, fmt):
+    """
+    Writes a table as path.parquet or path.json (records), returns the file name
+    """
+    if fmt == 'parquet':
+        df_aux.to_parquet(path + '.parquet', index=False)
+        return os.path.basename(path) + '.parquet'
+    df_aux.to_json(path + '.json', orient='records', date_format='iso')
+    return os.path.basename(path) + '.json'
+
+
+def write_preset(directory, preset, tables, metrics, figures, fmt):
+    """
+    Writes the artifacts of one preset into directory, returns its manifest entry
+    """
+    os.makedirs(directory)
+    files = {name: write_table(df_aux, os.path.join(directory, name), fmt) for name, df_aux in tables.items()}
+
+    with open(os.path.join(directory, 'metrics.json'), 'w') as f:
+        json.dump(metrics, f, indent=2)
+    files['metrics'] = 'metrics.json'
+
+    for name, fig in figures.items():
+        files[name + '_figure'] = name + '.plotly.json'
+        with open(os.path.join(directory, files[name + '_figure']), 'w') as f:
+            f.write(fig.to_json())
+
+    start, end = (d.date().isoformat() for d in preset['date_range'])
+    return {'date_range': [start, end], 'traffic': preset['traffic'], 'weather': preset['weather'],
+            'filter_state': filter_state(preset['date_range'], preset['traffic'], preset['weather']),
+            'path': os.path.basename(directory), 'files': files}
+
+
+def version_name(version):
+    """
+    Directory of a dataset version (utils/data.py) for this ARTIFACT_VERSION
+    """
+    digest = hashlib.sha1(repr(version).encode()).hexdigest()[:12]
+    return 'v{}-{}'.format(ARTIFACT_VERSION, digest)
+
+
+def _write_json(value, path):
+    # Atomic replace: readers see the old or the new file, never a mix
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(value, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def precompute(path=DATA_PATH, output=OUTPUT_PATH, fmt='parquet', traffic='each', weather='all', force=False):
+    """
+    Writes the artifacts of the dataset at path for the preset grid under
+    output, returns the manifest (the existing one when this version was
+    already written and not force)
+    """
+    version = dataset_version(path)
+    directory = os.path.join(output, version_name(version))
+    if os.path.exists(os.path.join(directory, MANIFEST)) and not force:
+        return read_manifest(output, os.path.basename(directory))
+
+    cube, persons = load_cube(path)
+    data = {'df1': load_data(path, columns=COLUMNS), 'cube': cube, 'persons': persons, 'sketch': load_sketch(path),
+            'distinct': load_distinct(path), 'spatial': load_spatial(path)}
+
+    tmp_directory = directory + '.tmp'
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+    entries = {}
+    for preset in presets(cube, traffic, weather):
+        start = time.perf_counter()
+        tables, metrics, figures = aggregates(data, preset)
+        entries[preset['id']] = write_preset(os.path.join(tmp_directory, preset['id']), preset, tables, metrics,
+                                             figures, fmt)
+        entries[preset['id']]['seconds'] = round(time.perf_counter() - start, 3)
+
+    manifest = {'artifact_version': ARTIFACT_VERSION, 'dataset': dataset_label(path), 'dataset_version': version,
+                'created': pd.Timestamp.now(tz='UTC').isoformat(), 'format': fmt, 'rows': len(data['df1']),
+                'presets': entries}
+    _write_json(manifest, os.path.join(tmp_directory, MANIFEST))
+
+    # The finished version replaces any older copy in one rename
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_directory, directory)
+    _write_json({'path': os.path.basename(directory), 'dataset': manifest['dataset'],
+                 'created': manifest['created']}, os.path.join(output, LATEST))
+    manifest['path'] = os.path.basename(directory)
+    return manifest
+
+
+def read_manifest(output=OUTPUT_PATH, name=None):
+    """
+    Manifest of a version directory under output (the latest one by
+    default), with its directory name under 'path'
+    """
+    if name is None:
+        with open(os.path.join(output, LATEST)) as f:
+            name = json.load(f)['path']
+    with open(os.path.join(output, name, MANIFEST)) as f:
+        manifest = json.load(f)
+    manifest['path'] = name
+    return manifest
+
+
+def find_preset(manifest, date_range, traffic_condition, weather_condition):
+    """
+    Id of the preset matching a sidebar selection, None when it is not precomputed
+    """
+    # As stored in the manifest: tuples become lists
+    key = json.loads(json.dumps(filter_state(date_range, traffic_condition, weather_condition)))
+    for preset_id, entry in manifest['presets'].items():
+        if entry['filter_state'] == key:
+            return preset_id
+    return None
+
+
+def read_artifact(output, manifest, preset_id, name):
+    """
+    A table (DataFrame), the metrics (dict) or a figure (name + '_figure',
+    plotly Figure) of a preset
+    """
+    entry = manifest['presets'][preset_id]
+    path = os.path.join(output, manifest['path'], entry['path'], entry['files'][name])
+    if path.endswith('.plotly.json'):
+        import plotly.io as pio
+        return pio.read_json(path)
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    if name == 'metrics':
+        with open(path) as f:
+            return json.load(f)
+    return pd.read_json(path, orient='records')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute the dashboard aggregates and charts for filter presets')
+    parser.add_argument('--csv', default=DATA_PATH, help='dataset: train.csv or a store directory')
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    parser.add_argument('--format', choices=['parquet', 'json'], default='parquet', help='format of the tables')
+    parser.add_argument('--traffic', choices=['all', 'each'], default='each',
+                        help='all traffic levels at once, or also one preset per level')
+    parser.add_argument('--weather', choices=['all', 'each'], default='all',
+                        help='all weather conditions at once, or also one preset per condition')
+    parser.add_argument('--force', action='store_true', help='rewrite the artifacts of an existing version')
+    args = parser.parse_args()
+
+    if args.format == 'parquet' and not snapshot.available():
+        raise SystemExit('pyarrow is required to write Parquet: pip install pyarrow, or use --format json')
+
+    start = time.perf_counter()
+    manifest = precompute(args.csv, args.output, args.format, args.traffic, args.weather, args.force)
+    print('{}: {} presets -> {} ({:.1f} s)'.format(manifest['dataset'], len(manifest['presets']),
+                                                  os.path.join(args.output, manifest['path']),
+                                                  time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
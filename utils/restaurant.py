@@ -0,0 +1,162 @@
+# Imports
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from utils.cube import rollup, total_mean
+from utils.geo import grid_bins
+from utils.metrics import timed
+from utils.sketch import PERCENTILES, TIME, quantiles
+from utils.spatial import nearest, radius_count
+
+# Lower bounds of the distance bands in km, the last band is open
+DISTANCE_BANDS = [0, 2, 5, 10, 15, 20]
+
+# =========================
+# RESTAURANT VIEW
+# =========================
+# Charts of pages/3_restaurant_view.py, importable by the benchmarks and scripts
+
+
+@timed
+def distance(cube2):
+    # distance_km is computed once at ingest (utils/data.py)
+    distance_mean = np.round(total_mean(cube2, 'distance'), 2)
+    return distance_mean
+
+
+@timed
+def delivery_time_festival(cube2, festival):
+    """
+    For festival, input Yes or No. Mean delivery time of those orders, NaN
+    when the selection has none
+    """
+    df_aux = rollup(cube2, 'festival', 'time')
+    df_aux = df_aux.loc[df_aux['festival'] == festival, 'time_mean']
+    return np.round(df_aux.iloc[0], 2) if len(df_aux) else np.nan
+
+
+@timed
+def avg_delivery_city(cube2):
+    df_aux = rollup(cube2, 'city', 'time')
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(name='Control', x= df_aux['city'], y= df_aux['time_mean'], error_y= dict(type='data', array= df_aux['time_std'])))
+    fig.update_layout(barmode='group')
+    return fig
+
+
+@timed
+def avg_delivery_order_type(cube2):
+    df_aux = rollup(cube2, ['city', 'type_of_order'], 'time')
+    # Slowest first within each city
+    df_aux = df_aux.sort_values(['city', 'time_mean'], ascending=[True, False], kind='stable').reset_index(drop=True)
+    return df_aux
+
+
+@timed
+def avg_delivery_by_city(cube2):
+    df_aux = rollup(cube2, 'city', 'distance')
+    fig = px.pie(df_aux, names='city', values= 'distance_mean')
+    return fig
+
+
+@timed
+def avg_deviation_by_city(cube2):
+    df_aux = rollup(cube2, ['city', 'road_traffic_density'], 'time')
+    # Slowest first within each city
+    df_aux = df_aux.sort_values(['city', 'time_mean'], ascending=[True, False], kind='stable').reset_index(drop=True)
+    # Object columns: plotly cannot colour the path of an empty categorical frame
+    df_aux = df_aux.astype({'city': 'object', 'road_traffic_density': 'object'})
+
+    fig = px.sunburst(df_aux, path=['city', 'road_traffic_density'], values= 'time_mean',
+        color= 'time_std', color_continuous_scale='RdBu_r',
+        color_continuous_midpoint= np.average(df_aux['time_std']) if len(df_aux) else None)
+    return fig
+
+
+@timed
+def delivery_time_percentiles(sketch2):
+    """
+    p50, p90 and p99 delivery time of the filtered orders, in a dict
+    """
+    df_aux = quantiles(sketch2, [])
+    return {name: np.round(df_aux.loc[0, name], 2) if len(df_aux) else np.nan for name in PERCENTILES}
+
+
+@timed
+def percentiles_by_city_traffic(sketch2):
+    df_aux = quantiles(sketch2, ['city', 'road_traffic_density'])
+    df_aux = df_aux.melt(id_vars=['city', 'road_traffic_density'], var_name='percentile', value_name='time_taken(min)')
+
+    fig = px.bar(df_aux, x='road_traffic_density', y='time_taken(min)', color='percentile', facet_col='city',
+                 barmode='group')
+    return fig
+
+
+@timed
+def percentiles_by_festival_order_type(sketch2):
+    df_aux = quantiles(sketch2, ['festival', 'type_of_order'])
+    df_aux = df_aux.sort_values(['festival', 'p99'], ascending=[True, False]).reset_index(drop=True)
+    return df_aux
+
+
+@timed
+def delivery_time_by_distance(df2):
+    """
+    Orders, mean and p50/p90/p99 delivery time per distance band, from one
+    histogram of band x minute
+    """
+    labels = ['{}-{} km'.format(lo, hi) for lo, hi in zip(DISTANCE_BANDS[:-1], DISTANCE_BANDS[1:])]
+    labels.append('{}+ km'.format(DISTANCE_BANDS[-1]))
+    if df2.empty:
+        return pd.DataFrame(columns=['distance_band', 'orders', 'time_mean'] + list(PERCENTILES))
+
+    band = np.clip(np.searchsorted(DISTANCE_BANDS, df2['distance_km'].to_numpy(), side='right') - 1, 0, None)
+    minutes = df2[TIME].to_numpy(dtype='int64')
+    width = int(minutes.max()) + 1
+    counts = np.bincount(band * width + minutes, minlength=len(labels) * width)
+    cells = np.flatnonzero(counts)
+    hist = pd.DataFrame({'distance_band': pd.Categorical.from_codes(cells // width, categories=labels),
+                         TIME: cells % width, 'count': counts[cells]})
+
+    df_aux = quantiles(hist, ['distance_band'])
+    codes = df_aux['distance_band'].cat.codes.to_numpy()
+    orders = np.bincount(band, minlength=len(labels))[codes]
+    df_aux['orders'] = orders
+    df_aux['time_mean'] = np.round(np.bincount(band, weights=minutes, minlength=len(labels))[codes] / orders, 2)
+    return df_aux[['distance_band', 'orders', 'time_mean'] + list(PERCENTILES)]
+
+
+@timed
+def distance_band_chart(df_aux):
+    fig = px.bar(df_aux, x='distance_band', y=list(PERCENTILES), barmode='group')
+    return fig
+
+
+@timed
+def nearest_restaurants(spatial, df2, positions, k=10, radius_km=5.0):
+    """
+    The k restaurants nearest the busiest delivery area of the selection
+    (positions: its rows in the dataset), with their distance to it and the
+    selected orders delivered within radius_km of each
+    """
+    if df2.empty:
+        return pd.DataFrame(columns=['restaurant_latitude', 'restaurant_longitude', 'distance_km', 'orders',
+                                     'orders_within_radius'])
+
+    # Busiest delivery area: the grid cell of about 5 km with the most orders
+    cells, _ = grid_bins(df2['delivery_location_latitude'], df2['delivery_location_longitude'], df2[TIME],
+                         cell_deg=0.05, max_cells=len(df2))
+    hotspot = cells.loc[cells['count'].idxmax()]
+
+    found = nearest(spatial['restaurant_index'], [hotspot['latitude']], [hotspot['longitude']], k)
+    df_aux = spatial['restaurants'].iloc[found['position']].reset_index(drop=True)
+    df_aux.insert(2, 'distance_km', np.round(found['distance_km'].to_numpy(), 2))
+
+    mask = np.zeros(len(spatial['delivery_index']['order']), dtype=bool)
+    mask[positions] = True
+    df_aux['orders_within_radius'] = radius_count(spatial['delivery_index'], df_aux['restaurant_latitude'],
+                                                  df_aux['restaurant_longitude'], radius_km, mask)
+    return df_aux
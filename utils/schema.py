@@ -0,0 +1,94 @@
+# Imports
+import numpy as np
+import pandas as pd
+
+# =========================
+# COMPACT SCHEMA
+# =========================
+# Typed in-memory layout of the cleaned dataset, applied once at ingest so the
+# cache, the Arrow snapshot and the store partitions all hold it:
+# - text columns with few distinct values become categoricals (int8/int16
+#   codes instead of one Python string per row) with sorted categories, so
+#   groupbys on them hash small integers and still come out in text order;
+# - integer columns are downcast to the smallest width that holds their range;
+# - coordinates are stored as float32 (~1 m at India's latitudes), the
+#   distance is computed from the float64 values before the downcast;
+# - columns no page uses (id, order/pickup times, vehicle type, multiple
+#   deliveries) are dropped; the hour of the order is kept as order_hour.
+# Ratings and distance_km stay float64: they feed the cube sums of squares.
+
+CATEGORY_COLUMNS = ['city', 'road_traffic_density', 'weatherconditions', 'festival', 'type_of_order',
+                    'delivery_person_id']
+
+INTEGER_COLUMNS = ['delivery_person_age', 'vehicle_condition', 'time_taken(min)', 'order_hour']
+
+FLOAT32_COLUMNS = ['restaurant_latitude', 'restaurant_longitude', 'delivery_location_latitude',
+                   'delivery_location_longitude']
+
+FLOAT64_COLUMNS = ['delivery_person_ratings', 'distance_km']
+
+# Every column kept after cleaning, in this order
+COLUMNS = ['order_date'] + CATEGORY_COLUMNS + INTEGER_COLUMNS + FLOAT64_COLUMNS + FLOAT32_COLUMNS
+
+
+def compact(df1):
+    """
+    Returns the cleaned dataset pruned to COLUMNS and converted to the compact dtypes
+    """
+    df1 = df1[[col for col in COLUMNS if col in df1.columns]].copy()
+
+    for col in CATEGORY_COLUMNS:
+        if col in df1.columns:
+            df1[col] = df1[col].astype('category')
+
+    for col in INTEGER_COLUMNS:
+        if col in df1.columns:
+            df1[col] = pd.to_numeric(df1[col], downcast='integer')
+
+    for col in FLOAT32_COLUMNS:
+        if col in df1.columns:
+            df1[col] = df1[col].astype('float32')
+
+    return df1
+
+
+def concat(frames):
+    """
+    pd.concat that keeps categorical columns categorical: partitions cleaned
+    separately have different categories, which pandas would turn into object
+    """
+    frames = list(frames)
+    if len(frames) > 1:
+        for col in frames[0].columns:
+            if all(isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames if col in f.columns):
+                categories = sorted(set().union(*(f[col].cat.categories for f in frames if col in f.columns)))
+                dtype = pd.CategoricalDtype(categories)
+                frames = [f.astype({col: dtype}) if col in f.columns else f for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def memory_report(before, after):
+    """
+    Per column dtype and deep memory size (MB) of two versions of the dataset,
+    with a TOTAL row. Columns missing from `after` were dropped.
+    """
+    rows = []
+    for col in before.columns:
+        before_mb = before[col].memory_usage(index=False, deep=True) / 2**20
+        if col in after.columns:
+            after_dtype = str(after[col].dtype)
+            after_mb = after[col].memory_usage(index=False, deep=True) / 2**20
+        else:
+            after_dtype, after_mb = 'dropped', 0.0
+        rows.append({'column': col, 'before_dtype': str(before[col].dtype), 'after_dtype': after_dtype,
+                     'before_mb': before_mb, 'after_mb': after_mb})
+
+    report = pd.DataFrame(rows)
+    total = {'column': 'TOTAL', 'before_dtype': '', 'after_dtype': '',
+             'before_mb': before.memory_usage(index=True, deep=True).sum() / 2**20,
+             'after_mb': after.memory_usage(index=True, deep=True).sum() / 2**20}
+    report = pd.concat([report, pd.DataFrame([total])], ignore_index=True)
+
+    with np.errstate(divide='ignore'):
+        report['ratio'] = report['before_mb'] / report['after_mb']
+    return report.round({'before_mb': 2, 'after_mb': 2, 'ratio': 1})
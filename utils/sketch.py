@@ -0,0 +1,68 @@
+# Imports
+import numpy as np
+import pandas as pd
+
+from utils.cube import DIMENSIONS
+
+# =========================
+# DELIVERY TIME PERCENTILES
+# =========================
+# Mergeable quantile sketch of the delivery time: per cube cell (order_date,
+# city, road_traffic_density, weatherconditions, festival, type_of_order)
+# the number of orders delivered in each whole minute. Delivery times are
+# whole minutes over a narrow range, so this histogram is an exact sketch
+# of bounded size (at most one row per cell and minute, whatever the number
+# of orders). Sketches merge by concatenation, like the cube partials of the
+# store, and any percentile of any filtered group is read from the
+# cumulative counts without touching the rows.
+
+TIME = 'time_taken(min)'
+
+SKETCH_COLUMNS = DIMENSIONS + [TIME]
+
+PERCENTILES = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99}
+
+
+def build_sketch(df1):
+    """
+    Count of orders per cube cell and delivery minute of the cleaned dataset
+    (orders without a delivery time are left out)
+    """
+    return df1.groupby(SKETCH_COLUMNS, observed=True).size().reset_index(name='count')
+
+
+def quantiles(sketch, by, percentiles=PERCENTILES):
+    """
+    Percentiles of the delivery time per group of the `by` dimensions (the
+    whole sketch when by is empty), interpolated linearly between minutes
+    like pandas quantile. Columns: by..., <name> per percentile
+    """
+    hist = sketch.groupby(by + [TIME], observed=True)['count'].sum()
+    hist = hist[hist > 0]
+    if hist.empty:
+        return pd.DataFrame(columns=by + list(percentiles))
+
+    minutes = hist.index.get_level_values(TIME).to_numpy(dtype='float64')
+    counts = hist.to_numpy(dtype='int64')
+    cumulative = np.cumsum(counts)
+
+    # Groups are consecutive runs of the sorted index: their first row and total
+    if by:
+        keys = hist.index.droplevel(TIME)
+        first = np.flatnonzero(np.diff(pd.factorize(keys)[0], prepend=-1) != 0)
+        df_aux = keys[first].to_frame(index=False)
+    else:
+        first = np.array([0])
+        df_aux = pd.DataFrame(index=[0])
+    offset = np.r_[0, cumulative][first]
+    n = np.r_[cumulative[first[1:] - 1], cumulative[-1]] - offset
+
+    for name, q in percentiles.items():
+        # Minute of the rank-th smallest order of each group (0-based)
+        position = (n - 1) * q
+        below = np.floor(position).astype('int64')
+        above = np.minimum(below + 1, n - 1)
+        low = minutes[np.searchsorted(cumulative, offset + below, side='right')]
+        high = minutes[np.searchsorted(cumulative, offset + above, side='right')]
+        df_aux[name] = low + (position - below) * (high - low)
+    return df_aux
@@ -0,0 +1,103 @@
+# Imports
+import argparse
+import os
+
+# =========================
+# COLUMNAR SNAPSHOT
+# =========================
+# The cleaned dataset is written once to an uncompressed Arrow IPC (Feather v2)
+# file. Pages then memory-map it and read only the columns they use, so a cold
+# worker skips the CSV parse and the cleaning, and every worker process on the
+# host shares the same page cache. pyarrow is optional: without it the data
+# layer keeps reading the CSV.
+#
+# Usage: python -m utils.snapshot [--csv train.csv] [--output train.arrow]
+
+SNAPSHOT_PATH = 'train.arrow'
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = feather = None
+
+_schemas = {}
+
+
+def available():
+    return feather is not None
+
+
+def snapshot_path(csv_path):
+    """
+    Snapshot file that belongs to a CSV: train.csv -> train.arrow
+    """
+    return os.path.splitext(csv_path)[0] + '.arrow'
+
+
+def write_snapshot(df1, path=SNAPSHOT_PATH):
+    """
+    Writes a cleaned frame to path. The file is written next to its final
+    name and renamed, so readers never see a partial snapshot.
+    """
+    tmp_path = path + '.tmp'
+    # Uncompressed so the columns can be memory-mapped without decoding
+    feather.write_feather(df1, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_snapshot(path=SNAPSHOT_PATH, columns=None):
+    """
+    Memory-maps the snapshot and reads only the given columns (all if None)
+    """
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    # split_blocks keeps numeric columns zero-copy on top of the mapped file
+    return table.to_pandas(split_blocks=True)
+
+
+def column_names(path):
+    """
+    Columns stored in the snapshot (read from the file schema once per version)
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _schemas:
+        with pa.memory_map(path) as source:
+            _schemas[key] = set(pa.ipc.open_file(source).schema.names)
+    return _schemas[key]
+
+
+def is_fresh(path, csv_path=None, columns=None):
+    """
+    True when the snapshot exists, holds the given columns and is not older
+    than the CSV it came from
+    """
+    if not available() or not os.path.exists(path):
+        return False
+    if columns is not None and not set(columns) <= column_names(path):
+        return False
+    if csv_path is None or not os.path.exists(csv_path):
+        return True
+    return os.stat(path).st_mtime_ns >= os.stat(csv_path).st_mtime_ns
+
+
+def main():
+    from utils.data import DATA_PATH, read_clean_csv
+
+    parser = argparse.ArgumentParser(description='Convert the cleaned dataset to an Arrow snapshot')
+    parser.add_argument('--csv', default=DATA_PATH)
+    parser.add_argument('--output', help='defaults to the CSV path with an .arrow extension')
+    args = parser.parse_args()
+    output = args.output or snapshot_path(args.csv)
+
+    if not available():
+        raise SystemExit('pyarrow is required to write the snapshot: pip install pyarrow')
+
+    df1 = read_clean_csv(args.csv)
+    write_snapshot(df1, output)
+    print('{} rows, {} columns -> {}'.format(len(df1), len(df1.columns), output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+# Imports
+import numpy as np
+import pandas as pd
+
+from utils.geo import EARTH_RADIUS_KM, haversine_km
+
+# =========================
+# SPATIAL INDEX
+# =========================
+# Grid index over a set of points (restaurants, delivery locations): the
+# points are sorted by lat/lon grid cell, row major, and every non-empty cell
+# keeps the range of its points. The cells of one grid row that intersect a
+# query box are consecutive, so their points are one contiguous slice: a
+# radius query reads one slice per grid row of its bounding box (two when
+# the box crosses the antimeridian) and keeps the points within the radius
+# (exact haversine). Nearest neighbours run radius queries of growing
+# radius until k points are found. Built once per dataset version;
+# positions returned are those of the indexed arrays.
+
+INDEX_CELL_DEG = 0.05
+
+# Columns the data layer builds the indexes from
+SPATIAL_COLUMNS = ['restaurant_latitude', 'restaurant_longitude', 'delivery_location_latitude',
+                   'delivery_location_longitude']
+
+
+def _cell_keys(rows, cols):
+    # One int64 per cell, ordered like (row, col)
+    return (rows << 32) + cols + 2**31
+
+
+def build_index(lat, lon, cell_deg=INDEX_CELL_DEG):
+    """
+    Grid index of points given in degrees
+    """
+    lat, lon = np.asarray(lat, dtype='float64'), np.asarray(lon, dtype='float64')
+    key = _cell_keys(np.floor(lat / cell_deg).astype('int64'), np.floor(lon / cell_deg).astype('int64'))
+    order = np.argsort(key, kind='stable')
+    keys, starts = np.unique(key[order], return_index=True)
+    return {'cell_deg': cell_deg, 'lat': lat[order], 'lon': lon[order], 'order': order,
+            'keys': keys, 'starts': starts, 'ends': np.r_[starts[1:], len(order)]}
+
+
+def _candidates(index, lat, lon, radius_km):
+    # Sorted positions of the points in the grid cells of the query's bounding box
+    cell_deg = index['cell_deg']
+    dlat = np.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = np.cos(np.radians(min(abs(lat) + dlat, 90.0)))
+    dlon = 180.0 if cos_lat < 1e-9 else min(dlat / cos_lat, 180.0)
+
+    # Longitude windows, wrapped around the antimeridian: every column once
+    # the box spans all longitudes (near a pole, or a radius of half the earth)
+    lon = (lon + 180.0) % 360.0 - 180.0
+    if dlon >= 180.0:
+        windows = [(-180.0, 180.0)]
+    elif lon - dlon < -180.0:
+        windows = [(-180.0, lon + dlon), (lon - dlon + 360.0, 180.0)]
+    elif lon + dlon > 180.0:
+        windows = [(lon - dlon, 180.0), (-180.0, lon + dlon - 360.0)]
+    else:
+        windows = [(lon - dlon, lon + dlon)]
+    columns = sorted((int(np.floor(lo / cell_deg)), int(np.floor(hi / cell_deg))) for lo, hi in windows)
+
+    slices = []
+    for row in range(int(np.floor((lat - dlat) / cell_deg)), int(np.floor((lat + dlat) / cell_deg)) + 1):
+        for col_lo, col_hi in columns:
+            lo = np.searchsorted(index['keys'], _cell_keys(row, col_lo), side='left')
+            hi = np.searchsorted(index['keys'], _cell_keys(row, col_hi), side='right')
+            if hi > lo:
+                slices.append(np.arange(index['starts'][lo], index['ends'][hi - 1]))
+    return np.concatenate(slices) if slices else np.zeros(0, dtype='int64')
+
+
+def radius_query(index, lat, lon, radius_km, mask=None):
+    """
+    Points within radius_km of each query point (arrays of degrees): a frame
+    with query (position of the query point), position (of the indexed
+    point) and distance_km, sorted by query then distance. mask (booleans
+    per indexed point) keeps only the selected points.
+    """
+    queries, positions, distances = [], [], []
+    for i, (q_lat, q_lon) in enumerate(zip(np.atleast_1d(lat), np.atleast_1d(lon))):
+        candidates = _candidates(index, q_lat, q_lon, radius_km)
+        distance = haversine_km(q_lat, q_lon, index['lat'][candidates], index['lon'][candidates])
+        keep = distance <= radius_km
+        if mask is not None:
+            keep &= mask[index['order'][candidates]]
+        found, distance = index['order'][candidates[keep]], distance[keep]
+        ranked = np.argsort(distance, kind='stable')
+        queries.append(np.full(len(found), i))
+        positions.append(found[ranked])
+        distances.append(distance[ranked])
+
+    if not queries:
+        return pd.DataFrame({'query': [], 'position': [], 'distance_km': []})
+    return pd.DataFrame({'query': np.concatenate(queries), 'position': np.concatenate(positions),
+                         'distance_km': np.concatenate(distances)})
+
+
+def radius_count(index, lat, lon, radius_km, mask=None):
+    """
+    Number of points within radius_km of each query point
+    """
+    found = radius_query(index, lat, lon, radius_km, mask)
+    return np.bincount(found['query'].to_numpy(dtype='int64'), minlength=len(np.atleast_1d(lat)))
+
+
+def nearest(index, lat, lon, k=5):
+    """
+    k nearest points of each query point (fewer when the index holds fewer):
+    a frame like radius_query. The radius starts at one grid cell and doubles
+    until k points are within it, so the result is exact.
+    """
+    frames = []
+    total = len(index['order'])
+    for i, (q_lat, q_lon) in enumerate(zip(np.atleast_1d(lat), np.atleast_1d(lon))):
+        radius_km = index['cell_deg'] * 111.0
+        while True:
+            found = radius_query(index, [q_lat], [q_lon], radius_km)
+            if len(found) >= min(k, total) or radius_km > np.pi * EARTH_RADIUS_KM:
+                break
+            radius_km *= 2
+        frames.append(found.head(k).assign(query=i))
+    if not frames:
+        return radius_query(index, [], [], 0.0)
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_spatial(df1):
+    """
+    Spatial indexes of the cleaned dataset: the distinct restaurant locations
+    (with their number of orders) and every delivery location (positions are
+    the rows of df1)
+    """
+    restaurants = (df1.groupby(['restaurant_latitude', 'restaurant_longitude'], sort=True).size()
+                   .reset_index(name='orders'))
+    return {'restaurants': restaurants,
+            'restaurant_index': build_index(restaurants['restaurant_latitude'], restaurants['restaurant_longitude']),
+            'delivery_index': build_index(df1['delivery_location_latitude'], df1['delivery_location_longitude'])}
@@ -0,0 +1,187 @@
+# Imports
+import argparse
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from utils import schema, sketch, snapshot, streaming
+
+# =========================
+# INCREMENTAL STORE
+# =========================
+# A directory of cleaned partitions, one per ingested CSV drop (same schema as
+# train.csv). Each drop is cleaned on its own, written as an Arrow partition
+# together with its cube and persons partials (utils/cube.py) and delivery
+# time sketch (utils/sketch.py), and recorded in manifest.json. Old
+# partitions are never rewritten: the partials are simply concatenated,
+# since the roll-ups sum/min/max/dedupe across rows.
+# The manifest keeps the sha256 of every ingested file, so a drop that was
+# already ingested (even under another name) is skipped, and the running
+# moments of the delivery time and ratings (utils/streaming.py).
+# Files larger than memory are streamed with --chunksize: one partition per
+# chunk of rows, only one chunk in memory at a time.
+#
+# Usage: python -m utils.store [--store data] [--chunksize 500000] train.csv orders_2022-04-07.csv ...
+# Point the dashboard at the store with INDIA_DELIVERY_DATA=data.
+
+STORE_PATH = 'data'
+MANIFEST = 'manifest.json'
+
+
+def manifest_path(store=STORE_PATH):
+    return os.path.join(store, MANIFEST)
+
+
+def is_store(path):
+    return os.path.isfile(manifest_path(path))
+
+
+def read_manifest(store=STORE_PATH):
+    if not is_store(store):
+        return {'version': 0, 'files': []}
+    with open(manifest_path(store)) as f:
+        return json.load(f)
+
+
+def _write_manifest(manifest, store):
+    # Atomic replace: readers see the old or the new manifest, never a mix
+    tmp_path = manifest_path(store) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path(store))
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _partition_files(store, partition):
+    base = os.path.join(store, partition)
+    return base + '.arrow', base + '.cube.arrow', base + '.persons.arrow', base + '.sketch.arrow'
+
+
+def _read_moments(manifest):
+    # Running aggregates of the store (utils/streaming.py), None before any row
+    if 'moments' not in manifest:
+        return None
+    return {name: pd.DataFrame(records) for name, records in manifest['moments'].items()}
+
+
+def read_moments(store=STORE_PATH):
+    """
+    Running count / mean / M2 of the delivery time and ratings of the whole
+    store: dict group name ('all', 'city', 'traffic') -> moment table, None
+    while the store holds no rows
+    """
+    return _read_moments(read_manifest(store))
+
+
+def ingest_file(csv_path, store=STORE_PATH, chunksize=None):
+    """
+    Cleans one CSV drop and appends it to the store. Returns the manifest
+    entry, or None when the file was already ingested. With chunksize the
+    file is streamed: read, cleaned and written chunksize rows at a time,
+    one partition per chunk, so its size is not bounded by memory.
+    """
+    from utils.cube import build_cube
+    from utils.data import read_clean_csv
+
+    if not snapshot.available():
+        raise RuntimeError('pyarrow is required for the incremental store: pip install pyarrow')
+
+    os.makedirs(store, exist_ok=True)
+    manifest = read_manifest(store)
+    sha256 = file_sha256(csv_path)
+    if any(entry['sha256'] == sha256 for entry in manifest['files']):
+        return None
+
+    moments = _read_moments(manifest)
+    version = manifest['version'] + 1
+    chunks = streaming.read_chunks(csv_path, chunksize) if chunksize else [read_clean_csv(csv_path)]
+    entry = {'source': os.path.basename(csv_path), 'sha256': sha256, 'rows': 0, 'partitions': []}
+
+    for number, df1 in enumerate(chunks, start=1):
+        if df1.empty:
+            # A header only drop, or every row a 'NaN ' sentinel row: nothing to write
+            continue
+        df1 = df1.reset_index(drop=True)
+        cube, persons = build_cube(df1)
+
+        partition = 'part-{:05d}-{:05d}'.format(version, number) if chunksize else 'part-{:05d}'.format(version)
+        data_file, cube_file, persons_file, sketch_file = _partition_files(store, partition)
+        snapshot.write_snapshot(df1, data_file)
+        snapshot.write_snapshot(cube, cube_file)
+        snapshot.write_snapshot(persons, persons_file)
+        snapshot.write_snapshot(sketch.build_sketch(df1), sketch_file)
+
+        entry['rows'] += len(df1)
+        entry['partitions'].append(partition)
+        moments = streaming.update_moments(moments, df1)
+
+    # The manifest is written last: the partitions are visible only once complete
+    manifest['version'] = version
+    manifest['files'].append(entry)
+    if moments is not None:
+        manifest['moments'] = {name: table.to_dict('records') for name, table in moments.items()}
+    _write_manifest(manifest, store)
+    return entry
+
+
+def _read_partitions(store, suffix_index, columns=None):
+    frames = [snapshot.read_snapshot(_partition_files(store, partition)[suffix_index], columns)
+              for entry in read_manifest(store)['files'] for partition in entry['partitions']]
+    return schema.concat(frames)
+
+
+def read_store(store=STORE_PATH, columns=None):
+    """
+    Cleaned rows of every partition (only the given columns)
+    """
+    return _read_partitions(store, 0, columns)
+
+
+def read_store_cube(store=STORE_PATH):
+    """
+    (cube, persons) of the store, concatenated from the stored partials
+    """
+    return _read_partitions(store, 1), _read_partitions(store, 2)
+
+
+def read_store_sketch(store=STORE_PATH):
+    """
+    Delivery time sketch of the store, concatenated from the stored partials
+    """
+    return _read_partitions(store, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Append new order CSV drops to the incremental store')
+    parser.add_argument('files', nargs='*')
+    parser.add_argument('--store', default=STORE_PATH)
+    parser.add_argument('--chunksize', type=int, help='stream the files this many rows at a time')
+    parser.add_argument('--summary', action='store_true', help='print the running aggregates of the store')
+    args = parser.parse_args()
+
+    for path in args.files:
+        entry = ingest_file(path, args.store, args.chunksize)
+        if entry is None:
+            print('{}: already ingested, skipped'.format(path))
+        else:
+            print('{}: {} rows -> {} partition(s)'.format(path, entry['rows'], len(entry['partitions'])))
+
+    moments = read_moments(args.store) if args.summary else None
+    if moments is not None:
+        for name, by in streaming.GROUPS.items():
+            for measure in streaming.MEASURES.values():
+                print('\n{} per {}'.format(measure, name))
+                print(streaming.summary(moments[name], by, measure).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# Imports
+import numpy as np
+import pandas as pd
+
+# =========================
+# STREAMING INGEST
+# =========================
+# Out-of-core reading of order histories larger than memory: the CSV is read
+# in chunks of rows, each chunk goes through the same cleaning as a whole
+# file (clean_data, derived columns, compact schema) and is handed over
+# before the next one is read.
+# Running aggregates are kept as mergeable moments per group: the count,
+# mean and M2 (sum of squared deviations, Welford) of the delivery time and
+# the ratings, overall, per city and per traffic density. Two moment tables
+# merge exactly with Chan's formula, so chunks, files or workers can be
+# combined in any order without the cancellation of a sum of squares.
+
+# Cleaned column -> prefix of its moment columns
+MEASURES = {'time_taken(min)': 'time', 'delivery_person_ratings': 'rating'}
+
+# Name -> group columns of the running aggregates
+GROUPS = {'all': [], 'city': ['city'], 'traffic': ['road_traffic_density']}
+
+
+def read_chunks(path, chunksize=500000):
+    """
+    Yields the cleaned chunks of a raw orders CSV, one at a time
+    """
+    from utils.data import add_derived_columns, clean_data
+    from utils.schema import compact
+
+    for df_raw in pd.read_csv(path, chunksize=chunksize):
+        df1 = compact(add_derived_columns(clean_data(df_raw)))
+        if not df1.empty:
+            yield df1.sort_values('order_date', kind='stable')
+
+
+def chunk_moments(df1, by):
+    """
+    count, mean and M2 of every measure per group of the `by` columns of a
+    chunk (one row when by is empty). Group keys are returned as text.
+    """
+    parts = {}
+    if by and df1.empty:
+        return pd.DataFrame(columns=by + [name + suffix for name in MEASURES.values()
+                                          for suffix in ('_count', '_mean', '_m2')])
+    if by:
+        for col, name in MEASURES.items():
+            values = df1.groupby(by, observed=True)[col]
+            n = values.count()
+            parts[name + '_count'] = n
+            parts[name + '_mean'] = values.mean().fillna(0.0)
+            parts[name + '_m2'] = (values.var(ddof=0) * n).fillna(0.0)
+        moments = pd.DataFrame(parts).reset_index()
+        return moments.astype({col: str for col in by})
+
+    for col, name in MEASURES.items():
+        values = df1[col].dropna().to_numpy(dtype='float64')
+        mean = values.mean() if len(values) else 0.0
+        parts[name + '_count'] = [len(values)]
+        parts[name + '_mean'] = [mean]
+        parts[name + '_m2'] = [((values - mean) ** 2).sum()]
+    return pd.DataFrame(parts)
+
+
+def merge_moments(a, b, by):
+    """
+    Moments of the union of the rows behind two moment tables (Chan et al.
+    pairwise update), matched on the `by` columns
+    """
+    if by:
+        merged = a.merge(b, on=by, how='outer', suffixes=('_a', '_b'), sort=True)
+    else:
+        merged = a.add_suffix('_a').join(b.add_suffix('_b'))
+
+    out = merged[by].copy()
+    for name in MEASURES.values():
+        na, ma, m2a, nb, mb, m2b = (merged[name + col + side].fillna(0).to_numpy(dtype='float64')
+                                    for side in ('_a', '_b') for col in ('_count', '_mean', '_m2'))
+        n = na + nb
+        delta = mb - ma
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[name + '_count'] = n.astype('int64')
+            out[name + '_mean'] = np.where(n > 0, ma + delta * nb / n, 0.0)
+            out[name + '_m2'] = m2a + m2b + np.where(n > 0, delta * delta * na * nb / n, 0.0)
+    return out
+
+
+def summary(moments, by, measure):
+    """
+    by..., count, mean and std (ddof=1, NaN for less than two values) of a
+    measure ('time' or 'rating') from its moments
+    """
+    n = moments[measure + '_count'].to_numpy(dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.where(n > 1, np.sqrt(moments[measure + '_m2'].to_numpy(dtype='float64') / (n - 1)), np.nan)
+    return pd.DataFrame({**{col: moments[col] for col in by},
+                         'count': moments[measure + '_count'].astype('int64'),
+                         'mean': moments[measure + '_mean'], 'std': std})
+
+
+def update_moments(moments, df1):
+    """
+    Running aggregates of every group after one more chunk (moments: dict
+    name -> moment table, or None before the first chunk). Empty chunks
+    leave them unchanged.
+    """
+    if df1.empty:
+        return moments
+    new = {name: chunk_moments(df1, by) for name, by in GROUPS.items()}
+    if moments is None:
+        return new
+    return {name: merge_moments(moments[name], new[name], GROUPS[name]) for name in GROUPS}
@@ -0,0 +1,172 @@
+# Imports
+import functools
+
+import numpy as np
+import pandas as pd
+
+# =========================
+# CALENDAR AND TIME SERIES
+# =========================
+# Calendar dimension: one row per day between two dates with integer keys
+# (day number since 1970-01-01, week of year as strftime '%U', ISO year and
+# week, year-week yyyyww and weekday, Monday=0), computed with integer
+# arithmetic and cached per date range, so no string is ever formatted per
+# row. Frames with an order_date column (the cube, the persons table) are
+# mapped to it through their day number.
+# Time series: orders per day of a filtered cube are counted once into a
+# dense array over the calendar and turned into cumulative sums, so a daily,
+# weekly or rolling window total is a difference of two cumulative values:
+# the cost depends on the number of days, not on rows or cells. Distinct
+# people are not summable over days, so the people active in a rolling
+# window are counted from the (day, person) pairs in one pass.
+# The hour of each order (order_hour, -1 when unknown) is kept per row in the
+# cleaned dataset, derived at ingest from time_orderd.
+
+WINDOWS = (7, 28)
+
+NS_PER_DAY = 86400 * 10**9
+
+
+def day_numbers(dates):
+    """
+    Days since 1970-01-01 of datetime values, as int32
+    """
+    values = np.asarray(dates, dtype='datetime64[ns]').view('int64')
+    return (values // NS_PER_DAY).astype('int32')
+
+
+@functools.cache
+def calendar(first_day, last_day):
+    """
+    One row per day from first_day to last_day (day numbers, both included):
+    order_date, day, week_of_year, iso_year, iso_week, year_week, weekday
+    """
+    day = np.arange(first_day, last_day + 1, dtype='int32')
+    dates = pd.DatetimeIndex(day.astype('int64') * NS_PER_DAY)
+    iso = dates.isocalendar()
+    weekday = dates.dayofweek.to_numpy().astype('int8')
+
+    # strftime '%U': weeks start on Sunday, days before the first Sunday are week 0
+    yday = dates.dayofyear.to_numpy() - 1
+    week_of_year = (yday + 7 - (weekday + 1) % 7) // 7
+
+    return pd.DataFrame({'order_date': dates, 'day': day, 'week_of_year': week_of_year.astype('int8'),
+                         'iso_year': iso['year'].to_numpy().astype('int16'),
+                         'iso_week': iso['week'].to_numpy().astype('int8'),
+                         'year_week': (iso['year'] * 100 + iso['week']).to_numpy().astype('int32'),
+                         'weekday': weekday})
+
+
+def calendar_of(frame):
+    """
+    Calendar covering the order dates of frame, and the position of each of
+    its rows in it
+    """
+    days = day_numbers(frame['order_date'])
+    if not len(days):
+        return calendar(0, -1), days
+    first_day = int(days.min())
+    return calendar(first_day, int(days.max())), days - first_day
+
+
+def order_hours(time_orderd):
+    """
+    Hour (0-23) of order times like '21:55:00', -1 when missing or malformed
+    """
+    hours = pd.to_numeric(time_orderd.astype('string').str.extract(r'^\s*(\d{1,2}):', expand=False),
+                          errors='coerce')
+    return hours.where(hours < 24, np.nan).fillna(-1).astype('int8')
+
+
+def _cumulative(values):
+    # Cumulative sums with a leading 0: the total of days i to j-1 is c[j] - c[i]
+    return np.concatenate([[0], np.cumsum(values)])
+
+
+def _rolling(cumulative, window):
+    # Total of the last `window` days up to each day (fewer at the start)
+    end = np.arange(1, len(cumulative))
+    return cumulative[end] - cumulative[np.maximum(end - window, 0)]
+
+
+def _rolling_distinct(days, persons, length, window):
+    # Distinct persons active in the last `window` days up to each day: every
+    # (person, day) pair counts the person from that day for `window` days,
+    # starting after the days its previous pair already covers
+    order = np.lexsort((days, persons))
+    days, persons = days[order], persons[order]
+    start = days.copy()
+    same = np.zeros(len(persons), dtype=bool)
+    same[1:] = persons[1:] == persons[:-1]
+    start[same] = np.maximum(days[same], days[np.flatnonzero(same) - 1] + window)
+
+    changes = np.zeros(length + window + 1, dtype='int64')
+    np.add.at(changes, start, 1)
+    np.add.at(changes, days + window, -1)
+    return np.cumsum(changes)[:length]
+
+
+def daily_orders(cube2, persons2=None, windows=WINDOWS):
+    """
+    Orders per calendar day of the filtered cube (days without orders
+    included) with their rolling totals over each window (orders_7d, ...).
+    With persons2, also the delivery people active each day and the
+    deliveries per active person, per day and over each window: orders of
+    the window over the distinct people active in it (persons_7d, ...).
+    """
+    days, positions = calendar_of(cube2)
+    df_aux = days[['order_date', 'day', 'week_of_year', 'year_week', 'weekday']].copy()
+
+    orders = np.bincount(positions, weights=cube2['count'], minlength=len(days)).astype('int64')
+    df_aux['orders'] = orders
+    cumulative_orders = _cumulative(orders)
+    for window in windows:
+        df_aux['orders_{}d'.format(window)] = _rolling(cumulative_orders, window)
+
+    if persons2 is not None:
+        # A person is counted once per day whatever the cells it delivered in
+        first_day = int(days['day'].iloc[0]) if len(days) else 0
+        pairs = pd.DataFrame({'day': day_numbers(persons2['order_date']) - first_day,
+                              'person': persons2['delivery_person_id'].array}).drop_duplicates()
+        day = pairs['day'].to_numpy(dtype='int64')
+        person = pd.factorize(pairs['person'])[0]
+        persons = np.bincount(day, minlength=len(days)).astype('int64')
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df_aux['persons'] = persons
+            df_aux['deliveries_per_person'] = orders / persons
+            for window in windows:
+                window_persons = _rolling_distinct(day, person, len(days), window)
+                df_aux['persons_{}d'.format(window)] = window_persons
+                df_aux['deliveries_per_person_{}d'.format(window)] = (
+                    _rolling(cumulative_orders, window) / window_persons)
+    return df_aux
+
+
+def weekly_orders(cube2, key='year_week'):
+    """
+    Orders per week of the calendar (key: 'year_week', ISO, or 'week_of_year', '%U')
+    """
+    df_aux = daily_orders(cube2, windows=())
+    return df_aux.groupby(key)['orders'].sum().reset_index()
+
+
+def orders_between(series, start, end):
+    """
+    Orders from start to end (both days included) of a daily_orders table,
+    from its cumulative counts
+    """
+    first, last = (day_numbers([pd.Timestamp(d).normalize()])[0] for d in (start, end))
+    days = series['day'].to_numpy()
+    cumulative = _cumulative(series['orders'].to_numpy())
+    lo, hi = np.searchsorted(days, [first, last + 1])
+    return int(cumulative[hi] - cumulative[lo])
+
+
+def hourly_orders(df2):
+    """
+    Orders per hour of the day (0-23) of the filtered dataset, known hours only
+    """
+    hours = df2['order_hour'].to_numpy()
+    counts = np.bincount(hours[hours >= 0].astype('int64'), minlength=24)
+    return pd.DataFrame({'order_hour': np.arange(24), 'orders': counts})